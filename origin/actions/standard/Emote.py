@@ -21,4 +21,4 @@ class Emote(Actions):
 
         message = Lang.capital(player.title) + " " + parsed.unparsed
         player.tell("%s" % message)
-        player.tell_others(message)
\ No newline at end of file
+        player.tell_others(message, kind="emote")
\ No newline at end of file
@@ -38,4 +38,4 @@ class Say(Actions):
                 # e.g., raise ActionRefused("You can't say that%s as they don't appear to be here with you.", target)
 
         player.tell("You say%s: %s" % (target, message))
-        player.tell_others("{Title} says%s: %s" % (target, message))
+        player.tell_others("{Title} says%s: %s" % (target, message), kind="say")
@@ -21,5 +21,5 @@ class Yell(Actions):
             message += "!"
 
         player.tell("You scream '%s'" % message)
-        player.tell_others("{Title} shouts '%s'" % message)
+        player.tell_others("{Title} shouts '%s'" % message, kind="say")
         player.location.tell_adjacent_locations("Someone nearby shouts '%s'" % message)
\ No newline at end of file
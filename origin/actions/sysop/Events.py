@@ -27,6 +27,11 @@ class Events(Actions):
         player.tell("Showing %d of %d total deferreds with server tick at %.1f sec)" % (num_shown, len(engine.deferreds), config.server_tick_time))
 
         for d in engine.deferreds:
+
+            # Cancelled deferreds linger until they come due or are swept out
+            if d.cancelled:
+                continue
+
             player.tell("Due      :", d.when_due(ctx.clock, realtime=True))
             player.tell("Function :", d.action)
             player.tell("Owner    :", d.owner)
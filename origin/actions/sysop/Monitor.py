@@ -2,11 +2,13 @@
 
 from origin.actions.Actions import Actions
 from origin.common.errors.ActionRefused import ActionRefused
+from origin.objects.creatures.Creature import Creature
 from origin.objects.items.Item import Item
 
 
 #
 # Monitor messages within a 'location', to/from a creature, or 'off' to remove existing monitors.
+# Naming kinds of message limits what's reported, e.g., 'monitor location arrival departure'.
 #
 class Monitor(Actions):
 
@@ -15,24 +17,31 @@ class Monitor(Actions):
     @Actions.sysop
     def func(player, parsed, ctx):
 
+            # The parser drops 'off' as a skip word so look for it in the original text
+            if parsed.unparsed.strip() == "off":
+
+                player.clear_monitors()
+                player.tell("All monitors have been disabled.")
+                return
+
             if not parsed.args:
                 raise ActionRefused("To monitor messages within a location use 'monitor location'. To monitor messages"
-                                    "to and from a player use 'monitor [name]'. Use 'monitor off' to remove all existing"
-                                    " monitors.")
+                                    " to and from a player use 'monitor [name]'. Follow either with the kinds of message"
+                                    " to report, any of: %s. Use 'monitor off' to remove all existing monitors."
+                                    % ", ".join(Creature.message_kinds))
 
             arg = parsed.args[0]
-            if arg == "location":
-
-                player.create_monitor(player.location)
-                player.tell("Now monitoring location '<location>%s</location>'." % player.location.name)
 
-            elif arg == "off":
+            if arg == "location":
 
-                player.clear_monitors()
-                player.tell("All monitors have been disabled.")
+                kinds, reporting = Monitor.kinds(parsed.args[1:])
+                player.create_monitor(player.location, kinds)
+                player.tell("Now monitoring location '<location>%s</location>'%s." % (player.location.name, reporting))
 
             elif parsed.obj_order:
 
+                kinds, reporting = Monitor.kinds(parsed.unrecognized)
+
                 for creature in parsed.obj_order:
 
                     if creature is player:
@@ -41,9 +50,26 @@ class Monitor(Actions):
                     if isinstance(creature, Item):
                         raise ActionRefused("You can not monitor items.")
 
-                    player.create_monitor(creature)
-                    player.tell("Now monitoring player or creature <creature>%s</creature>." % creature.name)
+                    player.create_monitor(creature, kinds)
+                    player.tell("Now monitoring player or creature <creature>%s</creature>%s." % (creature.name, reporting))
 
             else:
 
-                raise ActionRefused("Who would you like to monitor?")
\ No newline at end of file
+                raise ActionRefused("Who would you like to monitor?")
+
+
+    #
+    # The kinds of message named in the given words, if any, and a note saying so for the confirmation message
+    #
+    @staticmethod
+    def kinds(words):
+
+        for word in words:
+            if word not in Creature.message_kinds:
+                raise ActionRefused("There is no kind of message called '%s'. Use any of: %s."
+                                    % (word, ", ".join(Creature.message_kinds)))
+
+        if not words:
+            return None, ""
+
+        return list(words), " (%s only)" % ", ".join(words)
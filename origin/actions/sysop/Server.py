@@ -21,6 +21,12 @@ class Server(Actions):
 
         engine = ctx.engine
         config = ctx.config
+
+        # 'server stats' shows how long each phase of the main loop and server tick takes
+        if parsed.args and parsed.args[0] == "stats":
+            Server.stats(player, engine)
+            return
+
         player.tell("Server Information")
         player.tell("################")
 
@@ -32,7 +38,9 @@ class Server(Actions):
         sixtyfour = "(%d bits)" % (sys.maxsize.bit_length() + 1)
         implementation = platform.python_implementation()
         gc_objects = "??" if sys.platform == "cli" else str(len(gc.get_objects()))
-        avg_loop_duration = sum(engine.server_loop_durations) / len(engine.server_loop_durations)
+        loop_durations = engine.server_loop_durations
+        avg_loop_duration = sum(loop_durations) / len(loop_durations) if loop_durations else 0.0
+        ticks = engine.tick_scheduler
 
         # Display them to the player
         player.tell("Python version  : %s %s %s on %s" % (implementation, pyversion, sixtyfour, sys.platform))
@@ -43,7 +51,52 @@ class Server(Actions):
         player.tell("Game time       : %s (%dx real time)" % (ctx.clock, ctx.clock.multiplier))
         player.tell("Python objects  : %s" % gc_objects)
         player.tell("Players         : %d" % len(ctx.engine.all_players))
-        player.tell("Heartbeats      : %d" % len(engine.heartbeats))
-        player.tell("Deferreds       : %d" % len(engine.deferreds))
-        player.tell("Loop tick       : %.1f sec" % config.server_tick_time)
+        player.tell("Heartbeats      : %d (%d carried over)" % (len(engine.heartbeats), len(engine.pending_heartbeats)))
+        player.tell("Deferreds       : %d (%d carried over, %d cancelled)" % (
+            len(engine.deferreds), len(engine.pending_deferreds), engine.cancelled_deferreds))
+        player.tell("Regions         : %s occupied, %s dormant" % (
+            ", ".join(sorted(engine.occupied_regions)) or "none",
+            ", ".join("%s (%d deferreds, %d heartbeats parked)" % (region, len(engine.parked_deferreds.get(region, [])),
+                                                                  len(engine.parked_heartbeats.get(region, {})))
+                      for region in sorted(engine.dormant_since)) or "none"))
+        player.tell("Offloaded       : %d in flight, %d ran inline" % (engine.offload_pool.in_flight,
+                                                                     engine.offload_pool.ran_inline))
+        if engine.topic_bridge:
+            bridge = engine.topic_bridge.stats()
+            player.tell("Topic bridge    : %s, %d clients, %d events dropped" % (
+                config.topic_bridge_path, bridge["connections"], bridge["dropped"]))
+        if engine.wsgi_server:
+            http = engine.wsgi_server.stats()
+            player.tell("HTTP workers    : %d of %d busy, %d queued, %d refused, %.1f ms p95 wait" % (
+                http["busy"], http["workers"], http["queued"], http["rejected"], http["queue_wait"]["p95"] * 1000))
+            player.tell("HTTP streams    : %d of %d threads, %d refused" % (
+                http["streams"], http["max_streams"], http["streams_refused"]))
+        player.tell("Loop tick       : %.1f sec (%s)" % (config.server_tick_time, ticks.policy))
+        player.tell("Ticks           : %d run, %d skipped, %d overran" % (ticks.ticks, ticks.skipped, ticks.overruns))
+        player.tell("Tick lateness   : %.3f sec average, %.3f sec max" % (ticks.average_lateness, ticks.max_lateness))
         player.tell("Loop duration   : %.2f sec average" % avg_loop_duration)
+
+        # Only players with a backlog or who have had commands dropped are worth listing
+        for conn in list(engine.all_players.values()):
+            other = conn.player
+            if other and (other.input_queue_depth or other.dropped_commands):
+                player.tell("Command queue   : %s has %d waiting, %d dropped" % (other.name, other.input_queue_depth,
+                                                                             other.dropped_commands))
+
+
+    @staticmethod
+    def stats(player, engine):
+
+        player.tell("Server Statistics")
+        player.tell("################")
+        player.tell("Phase           :    count      p50      p95      p99      max  (ms)")
+
+        for phase, summary in engine.metrics()["phases"].items():
+            player.tell("%-15s : %8d %8.3f %8.3f %8.3f %8.3f" % (
+                phase, summary["count"], *(1000 * summary[key] for key in ("p50", "p95", "p99", "max"))))
+
+        player.tell("Heartbeats      :  objects    beats    total     mean  (ms)")
+
+        for name, (registered, calls, duration) in engine.heartbeats.stats().items():
+            player.tell("%-15s : %8d %8d %8.3f %8.3f" % (
+                name, registered, calls, 1000 * duration, 1000 * duration / calls if calls else 0.0))
@@ -19,15 +19,21 @@ class Subscriptions(Actions):
         player.tell("Active topics (%d total) :" % len(pending))
         player.tell("################")
         total = 0
+        total_dropped = 0
 
         for topic in sorted(pending, key=lambda t: str(t)):
-            iPending, idle, subscribers = pending[topic]
+            iPending, idle, subscribers, policy, dropped, high_water = pending[topic]
             total += iPending
-            if iPending or subscribers or idle < 10:
+            total_dropped += dropped
+            if iPending or subscribers or dropped or idle < 10:
                 player.tell("topic       :", topic)
-                player.tell("pending     :", pending)
+                player.tell("pending     :", iPending)
                 player.tell("idle        :", int(idle))
                 player.tell("subscribers :", subscribers)
+                player.tell("policy      :", policy)
+                player.tell("dropped     :", dropped)
+                player.tell("high water  :", high_water)
 
         player.tell("################")
         player.tell(("total pending:  " + str(total)))
+        player.tell(("total dropped:  " + str(total_dropped)))
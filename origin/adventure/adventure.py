@@ -17,6 +17,20 @@ class _Gameconfig(object):
             "name",
             "gender",
             "server_tick_time",
+            "tick_policy",
+            "max_catch_up_ticks",
+            "tick_budgets",
+            "deferred_compaction_threshold",
+            "journal_deferreds",
+            "offload_workers",
+            "offload_queue_limit",
+            "suspend_dormant_regions",
+            "topic_queue_limit",
+            "topic_queue_policy",
+            "topic_queue_limits",
+            "topic_queue_policies",
+            "topic_bridge_path",
+            "topic_bridge_topics",
             "gametime_to_realtime",
             "epoch",
             "player_start",
@@ -24,7 +38,19 @@ class _Gameconfig(object):
             "show_exits_in_look",
             "host",
             "port",
-            "ssl"
+            "ssl",
+            "command_queue_limit",
+            "command_rate",
+            "command_burst",
+            "commands_per_loop",
+            "long_poll_timeout",
+            "sse_keepalive",
+            "runtime",
+            "http_workers",
+            "http_queue_limit",
+            "http_streams",
+            "http_retry_after",
+            "metrics_allow"
         }
 
         for attr in config_items:
@@ -44,6 +70,34 @@ class Game:
     name = "callisti"                   # set a name to create a prebuilt player, None to use the character builder
     gender = "f"                        # m/f/n
     server_tick_time = 5.0              # time between server ticks in seconds
+    tick_policy = "catch-up"            # missed ticks are either run back to back ("catch-up") or dropped ("skip")
+    max_catch_up_ticks = 5              # most missed ticks run back to back before the rest are skipped
+    tick_budgets = {                    # seconds each tick phase may run before the rest carries over
+        "heartbeats": 0.05,
+        "deferreds": 0.05,
+        "connections": 0.02
+    }
+    deferred_compaction_threshold = 1000 # cancelled deferreds left in place before they're swept out in one go
+    journal_deferreds = True            # persist deferreds so scheduled world events survive a server restart
+    offload_workers = 4                 # worker threads for deferreds decorated with OffloadPool.offload
+    offload_queue_limit = 100           # most offloaded deferreds waiting or running before more run inline
+    suspend_dormant_regions = True      # park deferreds and heartbeats in regions without players until one arrives
+    topic_queue_limit = 1000            # most events a pub/sub topic queues between syncs
+    topic_queue_policy = "drop-oldest"  # what a full topic does: drop-oldest, drop-newest, coalesce, block-producer
+    topic_queue_limits = {}             # queue limits of particular topics, e.g., {"monitor-location": 100}
+    topic_queue_policies = {            # overflow policies of particular topics. Game events must never be dropped.
+        "actions": "block-producer",
+        "tells": "block-producer",
+        "dialogs": "block-producer",
+        "completions": "block-producer",
+        "monitor-creature": "coalesce",
+        "monitor-location": "coalesce"
+    }
+    topic_bridge_path = None            # UNIX socket other local processes may reach topics through, None to disable
+    topic_bridge_topics = (             # topics the bridge forwards, matched on the first part of tuple names
+        "monitor-creature",
+        "monitor-location"
+    )
     gametime_to_realtime = 5            # meaning: game time is X times the speed of real time (only used with "timer" tick method) (>=0)
     epoch = None                        # start date/time of the game clock
     player_start = None                 # name of the location where a player starts the game in
@@ -52,6 +106,18 @@ class Game:
     host = "localhost"                  # hostname to bind the server on
     port = 8180                         # port number to bind the server on
     ssl = False                         # Enable / disable SSL support
+    command_queue_limit = 100           # most commands a player may have queued before further input is dropped
+    command_rate = 4.0                  # commands per second a player's token bucket refills at
+    command_burst = 20                  # most commands a player may have processed back to back
+    commands_per_loop = 5               # most commands processed per player each main loop pass
+    long_poll_timeout = 20.0            # seconds a request polling for output waits for some, 0 to return at once
+    sse_keepalive = 15.0                # seconds between keep-alive comments on an idle server-sent events stream
+    runtime = "threads"                 # "threads" (threaded WSGI server) or "asyncio" (single event loop)
+    http_workers = 32                   # threads serving requests with the threads runtime
+    http_queue_limit = 128              # most connections waiting for a worker before more are refused with 503
+    http_streams = 512                  # most threads holding long-polls, event streams and WebSockets (two each) open
+    http_retry_after = 1                # seconds a refused client is asked to wait before retrying
+    metrics_allow = ()                  # client addresses that may GET /metrics, e.g., ("127.0.0.1",), none if empty
 
 
     #
@@ -3,6 +3,7 @@
 import datetime
 import inspect
 import sys
+import weakref
 from functools import total_ordering
 
 import types
@@ -15,6 +16,12 @@ import types
 class Deferred(object):
 
 
+    __slots__ = ("due", "owner", "action", "vargs", "kwargs", "owner_id", "cancelled", "journal_id")
+
+    # Whether each function takes a 'ctx' argument. Worked out once per function, not once per call.
+    call_plans = weakref.WeakKeyDictionary()
+
+
     def __init__(self, due, action, vargs, kwargs):
 
         assert due is None or isinstance(due, datetime.datetime)
@@ -53,6 +60,15 @@ class Deferred(object):
         self.vargs = vargs
         self.kwargs = kwargs
 
+        # Identifies the owner in the engine's index even after the owner reference is resolved or released
+        self.owner_id = id(self.owner)
+
+        # Cancelled deferreds are left in place and skipped rather than searched for and removed
+        self.cancelled = False
+
+        # Key of the deferred's entry in the engine's journal if it has one
+        self.journal_id = None
+
 
     def __eq__(self, other):
 
@@ -79,9 +95,27 @@ class Deferred(object):
         return datetime.timedelta(seconds=secs)
 
 
-    def __call__(self, *args, **kwargs):
+    #
+    # True if the function wants the 'ctx' keyword argument. Bound methods share their underlying function's plan.
+    #
+    @staticmethod
+    def takes_ctx(func):
+
+        func = getattr(func, "__func__", func)
+
+        try:
+            return Deferred.call_plans[func]
+        except KeyError:
+            pass
+        except TypeError:
+            return "ctx" in inspect.signature(func).parameters  # can't be weakly referenced so can't be cached
+
+        plan = Deferred.call_plans[func] = "ctx" in inspect.signature(func).parameters
 
-        self.kwargs = self.kwargs or {}
+        return plan
+
+
+    def __call__(self, *args, **kwargs):
 
         if callable(self.action):
             func = self.action
@@ -102,10 +136,13 @@ class Deferred(object):
 
             func = getattr(self.owner, self.action)
 
-        if "ctx" in inspect.getargspec(func).args:
-            self.kwargs["ctx"] = kwargs["ctx"]  # add a 'ctx' keyword argument to the call for convenience
+        call_kwargs = self.kwargs or {}
+
+        # Add a 'ctx' keyword argument to the call for convenience
+        if Deferred.takes_ctx(func):
+            call_kwargs = dict(call_kwargs, ctx=kwargs["ctx"])
 
-        func(*self.vargs, **self.kwargs)
+        func(*self.vargs, **call_kwargs)
 
         # Object's life is over. Let's cleanup.
 
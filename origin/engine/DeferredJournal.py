@@ -0,0 +1,224 @@
+# coding=utf-8
+
+import datetime
+import itertools
+import pickle
+import queue
+import sqlite3
+import sys
+import threading
+import types
+
+
+#
+# Persists the engine's deferreds to a SQLite journal so scheduled world events survive a restart.
+#
+# The engine records each deferred as it's scheduled and again once it has run or been cancelled. The changes
+# gathered during a server tick are committed together in a single transaction by a writer thread so the main loop
+# never waits on the disk. Only deferreds whose owner can be found again after a restart are journaled, i.e., a
+# region module or an object bound to a name in one.
+#
+class DeferredJournal(object):
+
+
+    def __init__(self, database, regions):
+
+        self.database = database
+        self.regions = regions
+        self.lock = threading.Lock()
+
+        # The first commit starts the journal over. By then the engine has restored the old entries and journaled
+        # them again along with everything else scheduled since it started.
+        self.batch = [()]
+        self.serials = itertools.count(1)
+        self.owner_paths = {}
+        self.writes = queue.Queue()
+        self.writer = None
+
+        with self.__connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS Deferred(
+                    id integer PRIMARY KEY,
+                    due varchar NOT NULL,
+                    owner varchar NOT NULL,
+                    action varchar NOT NULL,
+                    args blob NOT NULL
+                );""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS GameClock(
+                    id integer PRIMARY KEY CHECK (id = 0),
+                    clock varchar NOT NULL
+                );""")
+
+
+    def __connect(self):
+        return sqlite3.connect(self.database, timeout=5, check_same_thread=False)
+
+
+    #
+    # Map every object bound to a name in a region module to its path, e.g., "convent.bastet". Call once the regions
+    # have loaded.
+    #
+    def index_regions(self):
+
+        self.owner_paths = {}
+
+        for region_name, region in vars(self.regions).items():
+            if isinstance(region, types.ModuleType):
+                for name, obj in vars(region).items():
+                    if not name.startswith("_") and not isinstance(obj, (types.ModuleType, type)):
+                        self.owner_paths.setdefault(id(obj), "%s.%s" % (region_name, name))
+
+
+    #
+    # The path a deferred's owner can be found by again after a restart or None if it can't be
+    #
+    def owner_path(self, deferred):
+
+        if isinstance(deferred.owner, str):
+            return deferred.owner
+
+        return self.owner_paths.get(deferred.owner_id)
+
+
+    #
+    # Find a deferred's owner given its path
+    #
+    def resolve_owner(self, path):
+
+        if path.startswith("module:"):
+            return sys.modules.get(path[7:])
+
+        owner = self.regions
+
+        for name in path.split("."):
+            owner = getattr(owner, name, None)
+
+        return owner
+
+
+    #
+    # Record a newly scheduled deferred. Call holding the engine's deferreds_lock.
+    #
+    def append(self, deferred):
+
+        path = self.owner_path(deferred)
+
+        if path is None:
+            return
+
+        try:
+            args = pickle.dumps((deferred.vargs, deferred.kwargs))
+        except Exception:
+            return
+
+        deferred.journal_id = next(self.serials)
+
+        with self.lock:
+            self.batch.append((deferred.journal_id, deferred.due.isoformat(), path, deferred.action, args))
+
+
+    #
+    # Record that a deferred has run or was cancelled
+    #
+    def delete(self, deferred):
+
+        if deferred.journal_id is not None:
+
+            with self.lock:
+                self.batch.append((deferred.journal_id,))
+
+            deferred.journal_id = None
+
+
+    #
+    # Hand everything recorded since the last commit to the writer thread to be committed in one transaction along
+    # with the current game time
+    #
+    def commit(self, clock):
+
+        with self.lock:
+            batch, self.batch = self.batch, []
+
+        self.writes.put((batch, clock.isoformat()))
+
+        if not self.writer:
+            self.writer = threading.Thread(name="deferred-journal", target=self.__write, daemon=True)
+            self.writer.start()
+
+
+    #
+    # Returns the game time last committed and a list of (due, owner path, action name, vargs, kwargs) tuples for
+    # every journaled deferred. The game time is None if the journal is empty.
+    #
+    def load(self):
+
+        with self.__connect() as conn:
+
+            row = conn.execute("SELECT clock FROM GameClock").fetchone()
+            entries = []
+
+            for due, owner, action, args in conn.execute("SELECT due, owner, action, args FROM Deferred ORDER BY id"):
+                try:
+                    vargs, kwargs = pickle.loads(args)
+                except Exception:
+                    continue
+                entries.append((datetime.datetime.fromisoformat(due), owner, action, vargs, kwargs))
+
+        return (datetime.datetime.fromisoformat(row[0]) if row else None), entries
+
+
+    #
+    # Wait for pending commits to be written
+    #
+    def close(self, clock):
+
+        self.commit(clock)
+        self.writes.put(None)
+        self.writer.join(5)
+
+
+    def __write(self):
+
+        conn = self.__connect()
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        while True:
+
+            write = self.writes.get()
+
+            if write is None:
+                break
+
+            # Group every batch that's waiting into the same transaction
+            batches = [write]
+            while True:
+                try:
+                    write = self.writes.get_nowait()
+                except queue.Empty:
+                    break
+                if write is None:
+                    self.writes.put(None)
+                    break
+                batches.append(write)
+
+            try:
+
+                with conn:
+
+                    for batch, _ in batches:
+                        for entry in batch:
+                            if not entry:
+                                conn.execute("DELETE FROM Deferred")
+                            elif len(entry) == 1:
+                                conn.execute("DELETE FROM Deferred WHERE id=?", entry)
+                            else:
+                                conn.execute("INSERT OR REPLACE INTO Deferred VALUES (?, ?, ?, ?, ?)", entry)
+
+                    conn.execute("INSERT OR REPLACE INTO GameClock VALUES (0, ?)", (batches[-1][1],))
+
+            except sqlite3.Error as x:
+                print("Error writing the deferred journal:", repr(x), file=sys.stderr)
+
+        conn.close()
@@ -1,13 +1,16 @@
 # coding=utf-8
 
+import asyncio
 import collections
 import datetime
-import heapq
 import inspect
+import math
 import sys
 import threading
 import time
 import traceback
+import types
+import weakref
 
 from origin.parser import Lang
 from origin.common.errors.RetryVerb import RetryVerb
@@ -21,14 +24,22 @@ from origin.common.errors.SessionExit import SessionExit
 from origin import context
 from origin.actions.Actions import Actions
 from origin.engine.Deferred import Deferred
+from origin.engine.DeferredJournal import DeferredJournal
 from origin.engine.GameTime import GameTime
+from origin.engine.HeartbeatScheduler import HeartbeatScheduler
+from origin.engine.Histogram import Histogram
+from origin.engine.OffloadPool import OffloadPool
+from origin.engine.TickScheduler import TickScheduler
+from origin.engine.TimerWheel import TimerWheel
 from origin.engine.Context import Context
 from origin.engine.pubsub.Subscriber import Subscriber
 from origin.engine.pubsub.Topic import Topic
+from origin.engine.pubsub.TopicBridge import TopicBridge
 from origin.objects.creatures.players import Player
 from origin.objects.creatures.players.Accounts import Accounts
 from origin.objects.creatures.players.PlayerConnection import PlayerConnection
 from origin.objects.creatures.players.PlayerNaming import PlayerNaming
+from origin.objects.locations.Location import Location
 from origin.common.errors.NotDefaultVerb import NotDefaultVerb
 from origin.common.errors.UnknownVerbException import UnknownVerbException
 from origin.server.App import App
@@ -46,24 +57,56 @@ class Engine(Subscriber):
     topic_actions = Topic.static_topic("actions")
     topic_tells = Topic.static_topic("tells")
     topic_dialogs = Topic.static_topic("dialogs")
+    topic_completions = Topic.static_topic("completions")
 
+    # Phases of the main loop and server tick we keep timing histograms for
+    phases = ("dialogs", "input", "tells", "completions", "heartbeats", "deferreds", "topics", "idle", "flush")
 
-    def __init__(self):
 
-        self.heartbeats = set()
+    def __init__(self, database="origin.db"):
+
+        self.heartbeats = HeartbeatScheduler()
         self.unbound_exits = []
         self.deferreds_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.event_loop = None
+        self.async_wakeup = None
         self.server_started = datetime.datetime.now().replace(microsecond=0)
         self.server_loop_durations = collections.deque(maxlen=10)
+        self.phase_timings = {phase: Histogram() for phase in Engine.phases}
         self.actions = Actions()
         self.regions = origin.adventure.regions
         self.game = Game()
         self.config = self.game.get_config()
+        context.config = self.config
         self.game_clock = GameTime(self.config.epoch or self.server_started, self.config.gametime_to_realtime)
         self.__stop_mainloop = True
+        self.tick_scheduler = TickScheduler(self.config.server_tick_time, self.config.tick_policy,
+                                            self.config.max_catch_up_ticks)
+
+        # Deferreds keyed by the server tick they come due on
+        self.deferreds = TimerWheel()
+
+        # Deferreds indexed by the id of their owner so an owner's deferreds can be cancelled without a search.
+        # Cancelled deferreds stay where they are until they come due or enough pile up to sweep them out.
+        self.deferred_owners = {}
+        self.cancelled_deferreds = 0
+
+        # Tick work that ran out of its time budget and carries over to the next pass of the main loop
+        self.pending_heartbeats = collections.deque()
+        self.pending_deferreds = collections.deque()
+        self.pending_connection_checks = collections.deque()
 
-        # Using heapq for heap management
-        self.deferreds = []
+        # Deferreds that would hold up the tick run here and send their continuations back as completions
+        self.offload_pool = OffloadPool(self.config.offload_workers, self.config.offload_queue_limit,
+                                        self.__offload_done)
+
+        # Regions with a player in them. Deferreds and heartbeats of objects in other regions are parked until a
+        # player arrives. Parked work is kept by region along with the game time the region was first found empty.
+        self.occupied_regions = set()
+        self.parked_deferreds = {}
+        self.parked_heartbeats = {}
+        self.dormant_since = {}
 
         # Map all player connection objects to a tuple of (dialog, validator, echo_input)
         self.waiting_for_input = {}
@@ -71,29 +114,56 @@ class Engine(Subscriber):
         # Map all player names to their respective connection objects.
         self.all_players = {}
 
+        # Connections with pending input in arrival order. A dict doubles as an ordered set to de-duplicate them.
+        self.ready_lock = threading.Lock()
+        self.ready_connections = {}
+
+        # Connections out of command tokens mapped to the time their bucket will have refilled
+        self.throttled_connections = {}
+
+        # Connections with buffered output waiting to be sent to the player's client device
+        self.dirty_lock = threading.Lock()
+        self.dirty_connections = set()
+
+        Topic.set_limits(self.config.topic_queue_limit, self.config.topic_queue_policy,
+                         self.config.topic_queue_limits, self.config.topic_queue_policies)
+
         Engine.topic_actions.subscribe(self)
         Engine.topic_tells.subscribe(self)
         Engine.topic_dialogs.subscribe(self)
+        Engine.topic_completions.subscribe(self)
 
-        self.accounts = Accounts()
+        # Forwards topics to and from other local processes
+        self.topic_bridge = TopicBridge(self.config.topic_bridge_path, self.config.topic_bridge_topics, self.wake) \
+            if self.config.topic_bridge_path else None
+
+        # The threaded HTTP server, once started
+        self.wsgi_server = None
+
+        self.accounts = Accounts(database)
+
+        # Deferreds are journaled to the same database so scheduled world events survive a restart
+        self.journal = DeferredJournal(database, self.regions) if self.config.journal_deferreds else None
 
 
     #
     # Start the game engine main loop
     # The main loop executes in the primary thread
-    # The WSGI HTTP server runs as a background thread thanks to ThreadingMixIn
+    # The WSGI HTTP server accepts connections on a background thread and serves them from a pool of workers unless
+    # the asyncio runtime is configured in which case the engine and an asyncio HTTP server share a single event loop.
     #
     def start(self):
 
-        context.engine = self
-        context.config = self.config
+        self._init_game()
 
-        self.game.init(self)
+        if self.config.runtime == "asyncio":
 
-        self.config.player_start = self.game.player_start
-        self.config.sysop_start = self.game.sysop_start
+            self.__print_game_intro(None)
+            asyncio.run(self._start_async_main_loop())
+
+            return
 
-        wsgi_server = App.create_server(self)
+        self.wsgi_server = wsgi_server = App.create_server(self)
         wsgi_thread = threading.Thread(name="wsgi", target=wsgi_server.serve_forever)
         wsgi_thread.daemon = True
         wsgi_thread.start()
@@ -102,6 +172,67 @@ class Engine(Subscriber):
         self._start_main_loop()
 
 
+    #
+    # Make the engine globally available and let the game load its regions
+    #
+    def _init_game(self):
+
+        context.engine = self
+        context.config = self.config
+
+        self.game.init(self)
+
+        self.config.player_start = self.game.player_start
+        self.config.sysop_start = self.game.sysop_start
+
+        if self.journal:
+            self.__restore_deferreds()
+
+        if self.topic_bridge:
+            self.topic_bridge.start()
+
+
+    #
+    # Reload the deferreds journaled before the last shutdown with their due times rebased onto the current game
+    # time. Owners with journaled deferreds have the ones they scheduled while the regions loaded replaced. Deferreds
+    # owned by a module can't be told apart from those a module schedules as it loads so they're simply added.
+    #
+    def __restore_deferreds(self):
+
+        self.journal.index_regions()
+
+        clock, entries = self.journal.load()
+        offset = self.game_clock.clock - clock if clock else datetime.timedelta(0)
+        replaced = set()
+        restored = 0
+
+        for due, path, action, vargs, kwargs in entries:
+
+            owner = self.journal.resolve_owner(path)
+            func = getattr(owner, action, None)
+
+            if not callable(func):
+                continue
+
+            if not isinstance(owner, types.ModuleType) and id(owner) not in replaced:
+                self.remove_deferreds(owner)
+                replaced.add(id(owner))
+
+            self.defer(max(due + offset, self.game_clock.clock), func, *vargs, **kwargs)
+            restored += 1
+
+        # Journal whatever was scheduled before the journal knew where to find the owners
+        with self.deferreds_lock:
+            for deferred in self.deferreds:
+                if not deferred.cancelled and deferred.journal_id is None:
+                    self.journal.append(deferred)
+
+        self.journal.commit(self.game_clock.clock)
+
+        if entries:
+            print("Restored %d of %d journaled deferreds" % (restored, len(entries)))
+
+
     #
     # Start the game engine main loop
     #
@@ -121,114 +252,307 @@ class Engine(Subscriber):
                 exit(0)
 
 
+    #
+    # Start the game engine main loop as a coroutine on the running asyncio event loop. Ticks, deferreds, and input
+    # processing are all scheduled on that loop along with the HTTP server so no thread is spawned per request.
+    #
+    async def _start_async_main_loop(self):
+
+        self.event_loop = asyncio.get_running_loop()
+        self.async_wakeup = asyncio.Event()
+
+        http_server = App.create_async_server(self)
+        await http_server.start()
+
+        self.__stop_mainloop = False
+        self.tick_scheduler.start(time.time())
+
+        try:
+
+            while not self.__stop_mainloop:
+
+                self._flush_output()
+
+                # Sleep until woken by player input or the timer we set for the next server tick
+                timer = self.event_loop.call_later(self.__time_to_wakeup(), self.async_wakeup.set)
+                await self.async_wakeup.wait()
+                timer.cancel()
+                self.async_wakeup.clear()
+
+                self.__process_pending_work()
+
+        except:
+
+            print("Error processing main loop : \n", "".join(Engine.formatTraceback()), file=sys.stderr)
+            exit(0)
+
+        finally:
+
+            http_server.close()
+
+
     #
     # Process player input and output until the server terminates
     #
     def __main_loop(self):
 
-        loop_duration = 0
-        previous_server_tick = 0
+        self.tick_scheduler.start(time.time())
 
         while not self.__stop_mainloop:
 
-            # Push all pending events to subscribers
+            self._flush_output()
+
+            self.wakeup.wait(self.__time_to_wakeup())
+            self.wakeup.clear()
+
+            self.__process_pending_work()
+
+
+    #
+    # Seconds to sleep until player input arrives, a throttled player may continue, or the next server tick is due,
+    # whichever comes first. Deferreds are dispatched by the tick against the game clock it advances so the tick
+    # deadline bounds them too.
+    #
+    def __time_to_wakeup(self):
+
+        # Don't sleep while tick work is carried over
+        if self.has_background_work:
+            return 0.0
+
+        now = time.time()
+        wait = self.tick_scheduler.time_to_next(now)
+
+        # Throttled players get another turn once their token bucket refills
+        if self.throttled_connections:
+            wait = min(wait, max(0.0, min(self.throttled_connections.values()) - now))
+
+        return wait
+
+
+    #
+    # Drain a player's command queue in order. Every command costs a token from the connection's bucket and no more
+    # than commands_per_loop are processed per loop so every player with pending input gets a turn.
+    #
+    def __process_player_commands(self, conn):
+
+        for _ in range(self.config.commands_per_loop):
+
+            # Any input pending for this player?
+            if not conn.player or not conn.player.input_is_available.is_set():
+                return
+
+            # Out of tokens? We'll come back to this player once the bucket has refilled.
+            now = time.time()
+            if not conn.command_bucket.consume(now):
+                self.throttled_connections[conn] = now + conn.command_bucket.time_to_token(now)
+                return
+
+            try:
+
+                self.__process_input_line(conn, conn.player.get_input_line())
+
+            # Usually happens when someone uses ctrl-c to end the game server
+            except (KeyboardInterrupt, EOFError):
+                print("PROCESSING KEYBOARD INTERRUPT or EOF ERROR")
+                exit(0)
+
+            # If player is wrapping up and logging out say goodbye and send them any last
+            # messages pending for them.
+            except SessionExit as e:
+                self.game.goodbye(conn.player)
+                Engine.topic_tells.send(lambda conn=conn: self._disconnect(conn))
+                return
+
+            # Something unexpected has gone terribly wrong.
+            except Exception:
+
+                tb = "".join(Engine.formatTraceback())
+                txt = "\n* A Serious internal error has occurred :\n" + tb
+                print(txt)
+                conn.player.tell("A serious error has occurred on the server. Someone will notice and take "
+                                 "care of it as soon as possible.")
+
+            # Start any dialog the command opened so the next queued line is read as its response
             Topic.static_sync("dialogs")
 
-            # Send any buffered output to the player's client device
-            for conn in self.all_players.values():
+        # There's more input than we process in one loop so let the others have a turn and continue next loop
+        if conn.player and conn.player.input_is_available.is_set():
+            self.input_ready(conn)
+
+
+    #
+    # Process a single line of player input either as the response to a dialog or as an action
+    #
+    def __process_input_line(self, conn, line):
+
+        # Are we processing direct input sent from the user?
+        if conn in self.waiting_for_input:
+
+            dialog, validator, echo_input = self.waiting_for_input.pop(conn)
+            response = line
+
+            if validator:
+
+                try:
+
+                    response = validator(response)
+
+                except ValueError as x:
+
+                    # We didn't like the user's response so reprompt them using the ValueError message
+                    # payload or a standard reprompt if none was provided.
+                    prompt = conn.last_output_line
+                    conn.io.dont_echo_next = not echo_input
+                    conn.output(str(x) or "That does not appear to be a valid response. Please try again.")
+
+                    # Display the input prompt again and reschedule processing the response.
+                    conn.output_no_newline(prompt)
+                    self.waiting_for_input[conn] = (dialog, validator, echo_input)
+
+                    return
+
+            self.__continue_dialog(conn, dialog, response)
+
+        # No, just a standard action
+        else:
+
+            self._process_player_input(conn, line)
+
+
+    #
+    # Push pending dialogs and send any buffered output to the player's client device
+    #
+    def _flush_output(self):
+
+        timings = self.phase_timings
+
+        # Push all pending events to subscribers
+        start = time.perf_counter()
+        Topic.static_sync("dialogs")
+        timings["dialogs"].record(time.perf_counter() - start)
+
+        # Send any buffered output to the player's client device but only for connections that have some
+        start = time.perf_counter()
+
+        with self.dirty_lock:
+            dirty, self.dirty_connections = self.dirty_connections, set()
+
+        for conn in dirty:
+            if conn.player:
                 conn.write_output()
 
-            # Wait for server tick
-            wait_time = max(0.01, self.config.server_tick_time - loop_duration)
-            while wait_time > 0:
+        timings["flush"].record(time.perf_counter() - start)
 
-                # If we have player input break to process it
-                if any(conn.player.input_is_available.is_set() for conn in self.all_players.values()):
-                    break
 
-                # Try to never block more than a tenth of a second without checking for player input
-                sub_wait = min(0.1, wait_time)
-                time.sleep(sub_wait)
+    #
+    # Process player input, pending messages, and the server tick if it is due
+    #
+    def __process_pending_work(self):
 
-                wait_time -= sub_wait
+        # We track loop duration for reporting engine performance
+        loop_start = time.time()
 
-            # We track loop duration to dynamically adjust tick wait time
-            loop_start = time.time()
+        self._process_input()
+        self._sync_tells()
+        self._sync_completions()
+        self._process_bridge_requests()
+        self._process_ticks()
 
-            # Process player input
-            for conn in list(self.all_players.values()):
+        loop_duration = time.time() - loop_start
 
-                # Any input pending for this player?
-                if conn.player.input_is_available.is_set():
+        # Store some metrics about engine performance that can be reported to a Sysop using the server action.
+        self.server_loop_durations.append(loop_duration)
 
-                    try:
 
-                        # Are we processing direct input sent from the user?
-                        if conn in self.waiting_for_input:
+    #
+    # Process player input but only visit connections that queued some. Connections we throttled rejoin the queue
+    # once their token bucket has refilled.
+    #
+    def _process_input(self):
 
-                            dialog, validator, echo_input = self.waiting_for_input.pop(conn)
-                            response = conn.player.get_pending_input()[0]
+        start = time.perf_counter()
+        now = time.time()
 
-                            if validator:
+        with self.ready_lock:
 
-                                try:
+            for conn, when in list(self.throttled_connections.items()):
+                if when <= now:
+                    del self.throttled_connections[conn]
+                    self.ready_connections[conn] = None
 
-                                    response = validator(response)
+            ready, self.ready_connections = self.ready_connections, {}
 
-                                except ValueError as x:
+        for conn in ready:
 
-                                    # We didn't like the user's response so reprompt them using the ValueError message
-                                    # payload or a standard reprompt if none was provided.
-                                    prompt = conn.last_output_line
-                                    conn.io.dont_echo_next = not echo_input
-                                    conn.output(str(x) or "That does not appear to be a valid response. Please try again.")
+            # The connection may have closed since it was queued
+            if conn.player:
+                self.__process_player_commands(conn)
 
-                                    # Display the input prompt again and reschedule processing the response.
-                                    conn.output_no_newline(prompt)
-                                    self.waiting_for_input[conn] = (dialog, validator, echo_input)
+        self.phase_timings["input"].record(time.perf_counter() - start)
 
-                                    continue
 
-                            self.__continue_dialog(conn, dialog, response)
+    #
+    # Send any pending messages
+    #
+    def _sync_tells(self):
 
-                        # No, just a standard action
-                        else:
+        start = time.perf_counter()
+        Topic.static_sync("tells")
+        self.phase_timings["tells"].record(time.perf_counter() - start)
 
-                            self._process_player_input(conn)
 
-                    # Usually happens when someone uses ctrl-c to end the game server
-                    except (KeyboardInterrupt, EOFError):
-                        print("PROCESSING KEYBOARD INTERRUPT or EOF ERROR")
-                        exit(0)
+    #
+    # Run the continuations of offloaded work that has finished
+    #
+    def _sync_completions(self):
 
-                    # If player is wrapping up and logging out say goodbye and send them any last
-                    # messages pending for them.
-                    except SessionExit as e:
-                        self.game.goodbye(conn.player)
-                        Engine.topic_tells.send(lambda conn=conn: self._disconnect(conn))
+        start = time.perf_counter()
+        Topic.static_sync("completions")
+        self.phase_timings["completions"].record(time.perf_counter() - start)
 
-                    # Something unexpected has gone terribly wrong.
-                    except Exception:
 
-                        tb = "".join(Engine.formatTraceback())
-                        txt = "\n* A Serious internal error has occurred :\n" + tb
-                        print(txt)
-                        conn.player.tell("A serious error has occurred on the server. Someone will notice and take "
-                                         "care of it as soon as possible.")
+    #
+    # Carry out what topic bridge clients have asked for
+    #
+    def _process_bridge_requests(self):
 
-            # Send any pending messages
-            Topic.static_sync("tells")
+        if self.topic_bridge:
+            self.topic_bridge.process_requests()
 
-            # Process a server tick and keep track of length of execution
-            now = time.time()
-            if now - previous_server_tick >= self.config.server_tick_time:
-                self._tick()
-                previous_server_tick = now
 
-            loop_duration = time.time() - loop_start
+    #
+    # Called on a worker thread when offloaded work finishes. Hands the result to the main loop.
+    #
+    def __offload_done(self, future):
 
-            # Store some metrics about engine performance that can be reported to a Sysop using the server action.
-            self.server_loop_durations.append(loop_duration)
+        Engine.topic_completions.send(future)
+        self.wake()
+
+
+    #
+    # Process any server ticks that have come due and keep track of their length of execution.
+    # Ticks we fell too far behind on are skipped but still advance the game clock so it doesn't drift.
+    #
+    def _process_ticks(self):
+
+        ticks, skipped = self.tick_scheduler.due(time.time())
+
+        # Deferreds that came due on skipped ticks run on the next tick we do run
+        if skipped:
+            with self.deferreds_lock:
+                self.game_clock.add_realtime(datetime.timedelta(seconds=skipped * self.config.server_tick_time))
+                self.pending_deferreds.extend(self.deferreds.advance(skipped))
+
+            self.heartbeats.skip(skipped)
+
+        for _ in range(ticks):
+            tick_start = time.time()
+            self._tick()
+            self.tick_scheduler.record(time.time() - tick_start)
+
+        # Otherwise continue any tick work carried over now that player input has had its turn
+        if not ticks and self.has_background_work:
+            self.__process_background_work()
 
 
     #
@@ -238,47 +562,216 @@ class Engine(Subscriber):
     # Processing heartbeats
     # Processing deferred functions
     # Fullfilling subscriptions
-    # Emptying output buffers
     # Kicking idle players
-    # Cleaning up monitor topics
     #
     def _tick(self):
 
-        # Advance the game clock
-        self.game_clock.add_realtime(datetime.timedelta(seconds=self.config.server_tick_time))
+        # Advance the game clock and deferreds by exactly one tick. The tick scheduler keeps ticks on absolute
+        # deadlines.
+        with self.deferreds_lock:
+            self.game_clock.add_realtime(datetime.timedelta(seconds=self.config.server_tick_time))
+            self.pending_deferreds.extend(self.deferreds.advance())
+
+            if self.cancelled_deferreds > self.config.deferred_compaction_threshold:
+                self.__compact_deferreds()
+
+            # Commit the journal entries of deferreds scheduled, run, or cancelled since the last tick as one
+            if self.journal:
+                self.journal.commit(self.game_clock.clock)
+
+        if self.config.suspend_dormant_regions:
+            self.__update_occupancy()
+
+        # Queue the heartbeats due this tick and the connection checks. Work left over from a previous tick that ran
+        # out of time is finished first rather than queued a second time.
+        due = self.heartbeats.advance()
+
+        if self.config.suspend_dormant_regions:
+            due = [obj for obj in due if not self.__park_heartbeat(obj)]
+
+        if self.pending_heartbeats:
+            queued = set(self.pending_heartbeats)
+            due = [obj for obj in due if obj not in queued]
+
+        self.pending_heartbeats.extend(due)
+
+        if not self.pending_connection_checks:
+            self.pending_connection_checks.extend(self.all_players.items())
+
+        self.__process_background_work()
+
+
+    #
+    # Work out which regions have players in them and wake any dormant region a player has entered
+    #
+    def __update_occupancy(self):
+
+        void = Location.void()
+
+        self.occupied_regions = {conn.player.location.region for conn in self.all_players.values()
+                                 if conn.player and conn.player.location and conn.player.location is not void}
+
+        for region in [region for region in self.dormant_since if region in self.occupied_regions]:
+            self.__wake_region(region)
+
+
+    #
+    # The region an object is in or None if it isn't in one, e.g., a module
+    #
+    @staticmethod
+    def region_of(obj):
+
+        if isinstance(obj, Location):
+            return obj.region
+
+        location = getattr(obj, "location", None)
+
+        return location.region if isinstance(location, Location) else None
+
+
+    #
+    # Park a deferred if its owner is in an empty region. Returns True if it was parked.
+    #
+    def __park_deferred(self, deferred):
+
+        region = Engine.region_of(deferred.owner)
+
+        if region is None or region in self.occupied_regions:
+            return False
+
+        self.dormant_since.setdefault(region, self.game_clock.clock)
+        self.parked_deferreds.setdefault(region, []).append(deferred)
+
+        return True
+
+
+    #
+    # Stop an object's heartbeat if it's in an empty region. Returns True if it was parked.
+    #
+    def __park_heartbeat(self, obj):
+
+        region = Engine.region_of(obj)
+
+        if region is None or region in self.occupied_regions:
+            return False
+
+        period, _ = self.heartbeats.registered[obj]
+        self.heartbeats.unregister(obj)
+
+        self.dormant_since.setdefault(region, self.game_clock.clock)
+        self.parked_heartbeats.setdefault(region, weakref.WeakKeyDictionary())[obj] = period
+
+        return True
+
+
+    #
+    # Bring a dormant region up to date now that a player is in it. Objects whose work was parked get a call to
+    # catch_up with how long the region was dormant so they can fast-forward, then each parked deferred fires once
+    # and heartbeats start again.
+    #
+    def __wake_region(self, region):
+
+        dormant = self.game_clock.clock - self.dormant_since.pop(region)
+        deferreds = self.parked_deferreds.pop(region, [])
+        cancelled = [d for d in deferreds if d.cancelled]
+        deferreds = [d for d in deferreds if not d.cancelled]
+        heartbeats = dict(self.parked_heartbeats.pop(region, {}))
+        ctx = Context(self, self.game_clock, self.config, None)
+
+        owners = {id(obj): obj for obj in heartbeats}
+        owners.update((id(d.owner), d.owner) for d in deferreds)
+
+        for obj in owners.values():
+            try:
+                obj.catch_up(dormant, ctx)
+            except Exception:
+                print("\n* Exception while catching up %r:" % obj, file=sys.stderr)
+                print("".join(Engine.formatTraceback()), file=sys.stderr)
+
+        for obj, period in heartbeats.items():
+            self.heartbeats.register(obj, period)
+
+        self.pending_deferreds.extend(deferreds)
+
+        if cancelled:
+            self.__retire_deferreds(cancelled)
+
+
+    #
+    # True if heartbeats, deferreds, or connection checks are waiting for their turn
+    #
+    @property
+    def has_background_work(self):
+        return bool(self.pending_heartbeats or self.pending_deferreds or self.pending_connection_checks)
+
+
+    #
+    # Run queued heartbeats, deferreds, and connection checks. Each phase stops once it has used its share of the
+    # tick_budgets and leaves the rest for the next pass of the main loop so player input is never held up for long.
+    #
+    def __process_background_work(self):
 
-        # Process heartbeats
         ctx = Context(self, self.game_clock, self.config, None)
-        for obj in self.heartbeats:
-            obj.heartbeat(ctx)
+        budgets = self.config.tick_budgets
+        timings = self.phase_timings
+
+        # Process heartbeats
+        start = time.perf_counter()
+        deadline = time.time() + budgets["heartbeats"]
+        while self.pending_heartbeats and time.time() < deadline:
+
+            obj = self.pending_heartbeats.popleft()
+
+            # Skip anything that unregistered while it waited
+            if obj in self.heartbeats:
+                beat_start = time.perf_counter()
+                obj.heartbeat(ctx)
+                self.heartbeats.record(obj, time.perf_counter() - beat_start)
+
+        timings["heartbeats"].record(time.perf_counter() - start)
 
         # Process deferreds
-        while self.deferreds:
+        start = time.perf_counter()
+        deadline = time.time() + budgets["deferreds"]
+        finished = []
+        while self.pending_deferreds and time.time() < deadline:
 
-            deferred = None
-            with self.deferreds_lock:
-                if self.deferreds:
-                    deferred = self.deferreds[0]
-                    if deferred.due <= self.game_clock.clock:
-                        deferred = heapq.heappop(self.deferreds)
-                    else:
-                        deferred = None
-                        break
+            deferred = self.pending_deferreds.popleft()
 
-            # Actually calling the deferred function must be handled outside the lock
-            # so it can schedule a new deferred.
-            if deferred:
+            # Deferreds of objects in a region nobody is in wait for someone to arrive
+            if not deferred.cancelled and self.config.suspend_dormant_regions and self.__park_deferred(deferred):
+                continue
 
-                try:
-                    deferred(ctx=ctx)
-                except Exception:
-                    self.__report_deferred_exception(deferred)
+            finished.append(deferred)
+
+            if deferred.cancelled:
+                continue
+
+            try:
+                deferred(ctx=ctx)
+            except Exception:
+                self.__report_deferred_exception(deferred)
+
+        if finished:
+            self.__retire_deferreds(finished)
+
+        timings["deferreds"].record(time.perf_counter() - start)
 
         # Sync all topics (fulfill all subscriptions)
+        start = time.perf_counter()
         Topic.static_sync()
+        timings["topics"].record(time.perf_counter() - start)
+
+        # Check on player connections. Their output is flushed by the main loop.
+        start = time.perf_counter()
+        deadline = time.time() + budgets["connections"]
+        while self.pending_connection_checks and time.time() < deadline:
 
-        # Send pending messages to players
-        for name, conn in list(self.all_players.items()):
+            name, conn = self.pending_connection_checks.popleft()
+
+            # Skip anyone who left while they waited
+            if self.all_players.get(name) is not conn:
+                continue
 
             # Does this connection still look good?
             if conn.player and conn.io and conn.player.location:
@@ -294,20 +787,12 @@ class Engine(Subscriber):
                     conn.player.tell("\n")
                     self._disconnect(conn)
 
-                conn.write_output()
-
             # Nope, the connection is fubar so clean it up
             else:
 
                 self._disconnect(conn)
 
-        # Are there any idle monitor topics we need to destroy?
-        topicinfo = Topic.pending()
-        for topicname in topicinfo:
-            if isinstance(topicname, tuple) and topicname[0].startswith("monitor-"):
-                events, idle_time, subbers = topicinfo[topicname]
-                if events == 0 and not subbers and idle_time > 30:
-                    Topic.static_topic(topicname).destroy()
+        timings["idle"].record(time.perf_counter() - start)
 
 
     def __report_deferred_exception(self, deferred):
@@ -327,6 +812,7 @@ class Engine(Subscriber):
         connect_name = "_%d" % id(connection)  # unique temporary name
         new_player = Player.Player(connect_name, "n", "possibly a human", "an http session not yet signed in")
         connection.player = new_player
+        new_player.connection = connection
 
         # Associate the new HTTP session with the player connection object
         from origin.server.HttpIo import HttpIo
@@ -347,10 +833,12 @@ class Engine(Subscriber):
 
         if not any("True" in str(acc["isSysop"]) for acc in all_accounts.values()):
             Engine.topic_dialogs.send((connection, self._create_sysop(connection)))
+            self.wake()
             return connection
 
         # Prompt the user to login
         Engine.topic_dialogs.send((connection, self._login(connection)))
+        self.wake()
 
         return connection
 
@@ -377,7 +865,7 @@ class Engine(Subscriber):
             raise TypeError("connection or player object expected")
 
         assert self.all_players[name] is conn
-        conn.player.tell_others("%s has left." % Lang.capital(conn.player.subjective))
+        conn.player.tell_others("%s has left." % Lang.capital(conn.player.subjective), kind="departure")
         del self.all_players[name]
         conn.write_output()
 
@@ -592,12 +1080,25 @@ class Engine(Subscriber):
     def _stop(self):
 
         self.__stop_mainloop = True
+        self.wake()
 
         for conn in self.all_players.values():
             conn.write_output()
             conn.destroy()
 
         self.all_players.clear()
+        self.offload_pool.shutdown()
+
+        if self.journal:
+            self.journal.close(self.game_clock.clock)
+
+        if self.topic_bridge:
+            self.topic_bridge.close()
+
+        if self.wsgi_server:
+            self.wsgi_server.shutdown()
+            self.wsgi_server.server_close()
+
         time.sleep(0.1)
 
 
@@ -677,8 +1178,10 @@ class Engine(Subscriber):
         conn = self.all_players[player.name]
         del self.all_players[player.name]
 
-        old_monitor = player.get_monitor()
-        old_monitor.destroy()
+        # Monitors of the temporary name have nothing left to report
+        old_monitor = Topic.topics.get(("monitor-creature", player.name))
+        if old_monitor:
+            old_monitor.destroy()
 
         self.all_players[name_info.name] = conn
         name_info.apply_to(player)
@@ -687,52 +1190,44 @@ class Engine(Subscriber):
     #
     # Handle normal player actions
     #
-    def _process_player_input(self, conn):
+    def _process_player_input(self, conn, action):
 
         p = conn.player
 
-        assert p.input_is_available.is_set()
-
-        for action in p.get_pending_input():
-
-            if not action:
-                continue
-
-            # Process the action
-            try:
+        if not action:
+            return
 
-                # p.tell("\n")
-                self.__process_player_action(action, conn)
-                p.remember_parsed()
+        # Process the action
+        try:
 
-                # stop the loop after processing one action
-                break
+            self.__process_player_action(action, conn)
+            p.remember_parsed()
 
-            # If that didn't work we need to give the player some insight as to what went wrong.
-            except UnknownVerbException as x:
+        # If that didn't work we need to give the player some insight as to what went wrong.
+        except UnknownVerbException as x:
 
-                # If the verb is a direction just let them know they can't go that way
-                if x.verb in {"north", "east", "south", "west", "northeast", "northwest", "southeast", "southwest",
-                              "north east", "north west", "south east", "south west", "up", "down"}:
+            # If the verb is a direction just let them know they can't go that way
+            if x.verb in {"north", "east", "south", "west", "northeast", "northwest", "southeast", "southwest",
+                          "north east", "north west", "south east", "south west", "up", "down"}:
 
-                    p.tell("You can't go in that direction.")
+                p.tell("You can't go in that direction.")
 
-                # Otherwise let them know we don't support the verb they tried to use and remind them
-                # to always format input as lowercase
-                else:
+            # Otherwise let them know we don't support the verb they tried to use and remind them
+            # to always format input as lowercase
+            else:
 
-                    p.tell("The verb '%s' is unrecognized." % x.verb)
-                    if x.verb[0].isupper():
-                        p.tell("Just type in lowercase ('%s')." % x.verb.lower())
+                p.tell("The verb '%s' is unrecognized." % x.verb)
+                if x.verb[0].isupper():
+                    p.tell("Just type in lowercase ('%s')." % x.verb.lower())
 
-            # If the action w
-            except ActionRefused as x:
+        # If the action w
+        except ActionRefused as x:
 
-                p.remember_parsed()
-                p.tell(str(x))
+            p.remember_parsed()
+            p.tell(str(x))
 
-            except ParseError as x:
-                p.tell(str(x))
+        except ParseError as x:
+            p.tell(str(x))
 
 
     #
@@ -916,14 +1411,50 @@ class Engine(Subscriber):
         return conn.player if conn else None
 
 
-    def register_heartbeat(self, gameobj):
+    #
+    # Queue a connection that has pending input and wake the main loop to process it.
+    # Safe to call from any thread.
+    #
+    def input_ready(self, conn):
+
+        with self.ready_lock:
+            self.ready_connections[conn] = None
 
-        self.heartbeats.add(gameobj)
+        self.wake()
+
+
+    #
+    # Mark a connection as having buffered output so the main loop flushes it. Safe to call from any thread.
+    #
+    def output_pending(self, conn):
+
+        with self.dirty_lock:
+            self.dirty_connections.add(conn)
+
+
+    #
+    # Wake the main loop so pending input and events are handled without waiting for the next server tick.
+    # Safe to call from any thread, e.g., the WSGI request threads.
+    #
+    def wake(self):
+
+        if self.event_loop:
+            self.event_loop.call_soon_threadsafe(self.async_wakeup.set)
+        else:
+            self.wakeup.set()
+
+
+    #
+    # Have an object's heartbeat called every so many server ticks
+    #
+    def register_heartbeat(self, gameobj, every=1):
+
+        self.heartbeats.register(gameobj, every)
 
 
     def unregister_heartbeat(self, gameobj):
 
-        self.heartbeats.discard(gameobj)
+        self.heartbeats.unregister(gameobj)
 
 
     def register_exit(self, exit):
@@ -959,7 +1490,29 @@ class Engine(Subscriber):
         deferred = Deferred(due, action, vargs, kwargs)
 
         with self.deferreds_lock:
-            heapq.heappush(self.deferreds, deferred)
+            self.deferreds.insert(self.__deferred_tick(due), deferred)
+            self.deferred_owners.setdefault(deferred.owner_id, {})[id(deferred)] = deferred
+
+            if self.journal:
+                self.journal.append(deferred)
+
+
+    #
+    # The server tick on which the game clock will first reach the due time. Call holding the deferreds_lock.
+    #
+    def __deferred_tick(self, due):
+
+        remaining = due - self.game_clock.clock
+        tick_span = datetime.timedelta(seconds=self.config.server_tick_time) * self.game_clock.multiplier
+
+        if remaining <= datetime.timedelta(0):
+            return self.deferreds.now + 1
+
+        # A stopped game clock never reaches a future due time
+        if not tick_span:
+            return self.deferreds.now + TimerWheel.horizon
+
+        return self.deferreds.now + math.ceil(remaining / tick_span)
 
 
     def event(self, topicname, event):
@@ -982,15 +1535,75 @@ class Engine(Subscriber):
             assert inspect.isgenerator(dialog)
             self.__continue_dialog(conn, dialog, None)
 
+        elif topicname == "completions":
+
+            # The result of offloaded work is a continuation to run on the main loop, if anything
+            try:
+                continuation = event.result()
+                if callable(continuation):
+                    continuation()
+            except Exception:
+                self.__report_deferred_exception(event)
+
         else:
 
             raise ValueError("An unknown topic was provided: " + topicname)
 
 
+    #
+    # Cancel all deferreds belonging to owner. Costs only as much as the number of deferreds the owner has.
+    #
     def remove_deferreds(self, owner):
+
         with self.deferreds_lock:
-            self.deferreds = [d for d in self.deferreds if d.owner is not owner]
-            heapq.heapify(self.deferreds)
+
+            owned = self.deferred_owners.pop(id(owner), {})
+
+            for deferred in owned.values():
+
+                deferred.cancelled = True
+
+                if self.journal:
+                    self.journal.delete(deferred)
+
+            self.cancelled_deferreds += len(owned)
+
+
+    #
+    # Drop deferreds that have run or were skipped from the owner index and the count of those cancelled
+    #
+    def __retire_deferreds(self, deferreds):
+
+        with self.deferreds_lock:
+
+            for deferred in deferreds:
+
+                if deferred.cancelled:
+                    self.cancelled_deferreds -= 1
+                    continue
+
+                if self.journal:
+                    self.journal.delete(deferred)
+
+                owned = self.deferred_owners.get(deferred.owner_id)
+
+                if owned is not None:
+                    owned.pop(id(deferred), None)
+                    if not owned:
+                        del self.deferred_owners[deferred.owner_id]
+
+
+    #
+    # Sweep cancelled deferreds out of the timer wheel and the carried over work. Call holding the deferreds_lock.
+    #
+    def __compact_deferreds(self):
+
+        self.deferreds.remove_if(lambda d: d.cancelled)
+        self.pending_deferreds = collections.deque(d for d in self.pending_deferreds if not d.cancelled)
+        self.cancelled_deferreds = 0
+
+        for region, parked in self.parked_deferreds.items():
+            self.parked_deferreds[region] = [d for d in parked if not d.cancelled]
 
 
     #
@@ -1008,6 +1621,33 @@ class Engine(Subscriber):
         return hours, minutes, seconds
 
 
+    #
+    # Engine performance as a dictionary suitable for serializing as JSON. Phase timings are in seconds.
+    # Used by the "Server" Sysop action and the metrics HTTP path.
+    #
+    def metrics(self):
+
+        ticks = self.tick_scheduler
+
+        return {
+            "uptime": (datetime.datetime.now().replace(microsecond=0) - self.server_started).total_seconds(),
+            "players": len(self.all_players),
+            "heartbeats": len(self.heartbeats),
+            "deferreds": len(self.deferreds),
+            "cancelled_deferreds": self.cancelled_deferreds,
+            "ticks": {
+                "run": ticks.ticks,
+                "skipped": ticks.skipped,
+                "overruns": ticks.overruns,
+                "average_lateness": ticks.average_lateness,
+                "max_lateness": ticks.max_lateness
+            },
+            "phases": {phase: self.phase_timings[phase].summary() for phase in Engine.phases},
+            "topic_bridge": self.topic_bridge.stats() if self.topic_bridge else None,
+            "http": self.wsgi_server.stats() if self.wsgi_server else None
+        }
+
+
     #
     # Provides an exception traceback even if exception information is not provided by calling sys.exc_info()
     #
@@ -0,0 +1,101 @@
+# coding=utf-8
+
+import collections
+import weakref
+
+
+#
+# Keeps track of the objects receiving heartbeats and which of them are due on each server tick.
+#
+# An object beats every n ticks where n is the period it registered with. Objects are placed in one of n buckets
+# for their period so a tick only visits the bucket due on it. New registrations are spread across the buckets
+# to even out the work. Objects are held by weak reference so one that's never unregistered doesn't leak.
+#
+class HeartbeatScheduler(object):
+
+
+    def __init__(self):
+
+        self.tick = 0
+        self.buckets = {}                               # period -> list of WeakSets, one per phase
+        self.registered = weakref.WeakKeyDictionary()   # object -> (period, phase)
+        self.spread = collections.Counter()             # period -> registrations so far, used to pick a phase
+
+        # Heartbeats run and time spent per class for the 'server stats' Sysop action
+        self.calls = collections.Counter()
+        self.durations = collections.Counter()
+
+
+    def __len__(self):
+        return len(self.registered)
+
+
+    def __iter__(self):
+        return iter(list(self.registered.keys()))
+
+
+    def __contains__(self, obj):
+        return obj in self.registered
+
+
+    def register(self, obj, every=1):
+
+        assert every >= 1
+
+        if obj in self.registered:
+            self.unregister(obj)
+
+        if every not in self.buckets:
+            self.buckets[every] = [weakref.WeakSet() for _ in range(every)]
+
+        phase = self.spread[every] % every
+        self.spread[every] += 1
+
+        self.buckets[every][phase].add(obj)
+        self.registered[obj] = (every, phase)
+
+
+    def unregister(self, obj):
+
+        period, phase = self.registered.pop(obj, (None, None))
+
+        if period:
+            self.buckets[period][phase].discard(obj)
+
+
+    #
+    # Move on to the next tick and return the objects whose heartbeat is due on it
+    #
+    def advance(self):
+
+        self.tick += 1
+
+        return [obj for period, phases in self.buckets.items() for obj in phases[self.tick % period]]
+
+
+    #
+    # Move past ticks that were skipped without running their heartbeats
+    #
+    def skip(self, ticks):
+        self.tick += ticks
+
+
+    #
+    # Account for a heartbeat that took duration seconds
+    #
+    def record(self, obj, duration):
+
+        name = obj.__class__.__name__
+        self.calls[name] += 1
+        self.durations[name] += duration
+
+
+    #
+    # Returns a dictionary of class name -> (objects registered, heartbeats run, seconds spent)
+    #
+    def stats(self):
+
+        registered = collections.Counter(obj.__class__.__name__ for obj in self)
+        names = set(registered) | set(self.calls)
+
+        return {name: (registered[name], self.calls[name], self.durations[name]) for name in sorted(names)}
@@ -0,0 +1,86 @@
+# coding=utf-8
+
+import math
+
+
+#
+# Low overhead histogram of durations in seconds. Samples are counted in geometrically sized buckets so recording
+# is constant time and memory is fixed no matter how long the server runs. Percentiles are accurate to within the
+# bucket growth factor (10%).
+#
+class Histogram(object):
+
+
+    resolution = 1e-6       # upper bound of the smallest bucket (one microsecond)
+    growth = 1.1            # each bucket is 10% wider than the last
+    buckets = 200           # enough to reach beyond three minutes
+
+    __log_growth = math.log(growth)
+
+
+    def __init__(self):
+        self.reset()
+
+
+    def reset(self):
+
+        self.counts = [0] * Histogram.buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+    def record(self, value):
+
+        if value <= Histogram.resolution:
+            index = 0
+        else:
+            index = min(Histogram.buckets - 1, int(math.log(value / Histogram.resolution) / Histogram.__log_growth) + 1)
+
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+        if value > self.max:
+            self.max = value
+
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+    #
+    # Value below which the given fraction of samples fall, e.g., percentile(0.95)
+    #
+    def percentile(self, fraction):
+
+        if not self.count:
+            return 0.0
+
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+
+        for index, count in enumerate(self.counts):
+
+            seen += count
+
+            if seen >= rank:
+                return min(self.max, Histogram.resolution * Histogram.growth ** index)
+
+        return self.max
+
+
+    #
+    # Summary suitable for display or serializing as JSON
+    #
+    def summary(self):
+
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max
+        }
@@ -0,0 +1,98 @@
+# coding=utf-8
+
+import concurrent.futures
+import functools
+import threading
+
+from origin import context
+
+
+#
+# A bounded pool of worker threads for deferreds that would otherwise hold up the server tick, e.g., ones that do
+# I/O or heavy pathfinding.
+#
+# Decorate the deferred function with OffloadPool.offload. It then runs on a worker thread and must only read the
+# game world, never change it. If it returns a callable that continuation is run on the main loop once the work is
+# done, by way of the "completions" topic, and is where any changes to the world belong:
+#
+#     @OffloadPool.offload
+#     def do_plan(self, ctx):
+#         route = find_route(self.location, self.destination)
+#         return lambda: self.follow(route)
+#
+# When more than queue_limit jobs are waiting or running further jobs run immediately on the caller's thread.
+#
+class OffloadPool(object):
+
+
+    def __init__(self, workers, queue_limit, on_done):
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="offload")
+        self.queue_limit = queue_limit
+        self.on_done = on_done
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.ran_inline = 0
+
+
+    #
+    # Decorator marking a deferred function to run on the engine's offload pool
+    #
+    @staticmethod
+    def offload(func):
+
+        @functools.wraps(func)
+        def submit(*vargs, **kwargs):
+            context.engine.offload_pool.submit(func, *vargs, **kwargs)
+
+        return submit
+
+
+    #
+    # Run func on a worker thread. on_done is called with its future once it has finished.
+    #
+    def submit(self, func, *vargs, **kwargs):
+
+        with self.lock:
+            saturated = self.in_flight >= self.queue_limit
+            if not saturated:
+                self.in_flight += 1
+
+        if saturated:
+            self.ran_inline += 1
+            self.on_done(self.__run_inline(func, vargs, kwargs))
+            return
+
+        try:
+            future = self.executor.submit(func, *vargs, **kwargs)
+        except RuntimeError:
+            self.__finished(None)
+            raise
+
+        future.add_done_callback(self.__finished)
+
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+    def __finished(self, future):
+
+        with self.lock:
+            self.in_flight -= 1
+
+        if future is not None and not future.cancelled():
+            self.on_done(future)
+
+
+    @staticmethod
+    def __run_inline(func, vargs, kwargs):
+
+        future = concurrent.futures.Future()
+
+        try:
+            future.set_result(func(*vargs, **kwargs))
+        except Exception as x:
+            future.set_exception(x)
+
+        return future
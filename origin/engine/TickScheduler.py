@@ -0,0 +1,95 @@
+# coding=utf-8
+
+import collections
+
+
+#
+# Schedules server ticks against absolute real-time deadlines so the game clock doesn't drift under load.
+#
+# Tick n is due at start + n * tick_time regardless of how long previous ticks took. When the engine falls behind
+# the policy decides what happens to the deadlines it missed:
+#
+# "catch-up" - run every missed tick back to back, up to max_catch_up at a time, skipping any beyond that
+# "skip"     - run a single tick and skip the rest
+#
+# Skipped ticks still advance the game clock (see Engine) but run no heartbeats or deferreds.
+#
+class TickScheduler(object):
+
+
+    policies = ("catch-up", "skip")
+
+
+    def __init__(self, tick_time, policy="catch-up", max_catch_up=5):
+
+        if policy not in TickScheduler.policies:
+            raise ValueError("Unknown tick policy '%s'. Use one of: %s" % (policy, ", ".join(TickScheduler.policies)))
+
+        assert tick_time > 0 and max_catch_up >= 1
+
+        self.tick_time = tick_time
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.next_deadline = 0.0
+
+        # Accounting reported by the 'server' Sysop action
+        self.ticks = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.max_lateness = 0.0
+        self.lateness = collections.deque(maxlen=100)
+
+
+    #
+    # Schedule the first tick for the given real time
+    #
+    def start(self, now):
+        self.next_deadline = now
+
+
+    #
+    # Seconds until the next tick deadline, zero if it has already passed
+    #
+    def time_to_next(self, now):
+        return max(0.0, self.next_deadline - now)
+
+
+    #
+    # Returns a tuple of (ticks to run, ticks skipped) for the deadlines that have passed by real time now
+    # and moves on to the next deadline in the future.
+    #
+    def due(self, now):
+
+        if now < self.next_deadline:
+            return 0, 0
+
+        late = now - self.next_deadline
+        missed = int(late // self.tick_time) + 1
+
+        self.lateness.append(late)
+        self.max_lateness = max(self.max_lateness, late)
+
+        if self.policy == "catch-up":
+            run = min(missed, self.max_catch_up)
+        else:
+            run = 1
+
+        self.next_deadline += missed * self.tick_time
+        self.ticks += run
+        self.skipped += missed - run
+
+        return run, missed - run
+
+
+    #
+    # Record how long a tick took to execute. A tick that takes longer than the tick time is an overrun.
+    #
+    def record(self, duration):
+
+        if duration > self.tick_time:
+            self.overruns += 1
+
+
+    @property
+    def average_lateness(self):
+        return sum(self.lateness) / len(self.lateness) if self.lateness else 0.0
@@ -0,0 +1,128 @@
+# coding=utf-8
+
+
+#
+# Hierarchical timing wheel holding items due at a given tick. Used by the engine to store deferreds keyed by the
+# server tick they come due on.
+#
+# Each level is a ring of slots covering 256 times the span of the level below. Items are placed on the lowest
+# level whose span reaches their due tick and move down a level each time the wheel below completes a revolution
+# so inserting is O(1) and everything due on a tick is collected from a single slot in one go.
+#
+class TimerWheel(object):
+
+
+    bits = 8                            # each level has 2 ** bits slots
+    levels = 4                          # spans 2 ** 32 ticks, more than a century of one second ticks
+
+    slots = 1 << bits
+    mask = slots - 1
+    horizon = 1 << (bits * levels)
+
+
+    def __init__(self):
+
+        self.now = 0
+        self.count = 0
+        self.wheels = [[[] for _ in range(TimerWheel.slots)] for _ in range(TimerWheel.levels)]
+
+
+    def __len__(self):
+        return self.count
+
+
+    #
+    # All items in the order they come due. Only meant for reporting since it sorts every item.
+    #
+    def __iter__(self):
+
+        entries = [entry for wheel in self.wheels for slot in wheel for entry in slot]
+        entries.sort(key=lambda entry: entry[0])
+
+        return iter([item for _, item in entries])
+
+
+    #
+    # Schedule an item for the given tick. Ticks that have already passed are due on the next one.
+    #
+    def insert(self, tick, item):
+
+        self.__place(max(tick, self.now + 1), item)
+        self.count += 1
+
+
+    #
+    # Move the wheel forward the given number of ticks and return a list of every item that came due
+    #
+    def advance(self, ticks=1):
+
+        expired = []
+
+        for _ in range(ticks):
+
+            self.now += 1
+
+            # Completed a revolution of the lowest level so bring the next stretch of items down from above
+            if not self.now & TimerWheel.mask:
+                self.__cascade()
+
+            slot = self.wheels[0][self.now & TimerWheel.mask]
+
+            if slot:
+                self.wheels[0][self.now & TimerWheel.mask] = []
+                expired.extend(item for _, item in slot)
+
+        self.count -= len(expired)
+
+        return expired
+
+
+    #
+    # Remove every item the predicate holds true for and return how many were removed
+    #
+    def remove_if(self, predicate):
+
+        removed = 0
+
+        for wheel in self.wheels:
+            for index, slot in enumerate(wheel):
+
+                if slot:
+                    kept = [entry for entry in slot if not predicate(entry[1])]
+                    removed += len(slot) - len(kept)
+                    wheel[index] = kept
+
+        self.count -= removed
+
+        return removed
+
+
+    def __place(self, tick, item):
+
+        # Items beyond the horizon wait in the top level and are placed again each time it comes around
+        key = min(tick, self.now + TimerWheel.horizon - 1)
+        delta = key - self.now
+        level = 0
+
+        while delta >= 1 << (TimerWheel.bits * (level + 1)):
+            level += 1
+
+        self.wheels[level][(key >> (TimerWheel.bits * level)) & TimerWheel.mask].append((tick, item))
+
+
+    #
+    # Redistribute the current slot of each level above the lowest, moving on to the next level only when this
+    # one has also completed a revolution
+    #
+    def __cascade(self):
+
+        for level in range(1, TimerWheel.levels):
+
+            index = (self.now >> (TimerWheel.bits * level)) & TimerWheel.mask
+            slot, self.wheels[level][index] = self.wheels[level][index], []
+
+            for tick, item in slot:
+                self.__place(tick, item)
+
+            if index:
+                break
@@ -0,0 +1,49 @@
+# coding=utf-8
+
+
+#
+# Rate limiter handing out tokens at a steady rate up to a maximum burst. Used to meter how many commands a
+# single player may have processed so one flooding client can't starve the others.
+#
+class TokenBucket(object):
+
+
+    def __init__(self, rate, capacity, now=0.0):
+
+        assert rate > 0 and capacity >= 1
+
+        self.rate = rate            # tokens added per second
+        self.capacity = capacity    # most tokens the bucket can hold
+        self.tokens = capacity
+        self.stamp = now
+
+
+    def __refill(self, now):
+
+        if now > self.stamp:
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+
+
+    #
+    # Take a token if one is available. Returns False if the bucket is empty.
+    #
+    def consume(self, now):
+
+        self.__refill(now)
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        return False
+
+
+    #
+    # Seconds until the next token becomes available
+    #
+    def time_to_token(self, now):
+
+        self.__refill(now)
+
+        return max(0.0, (1 - self.tokens) / self.rate)
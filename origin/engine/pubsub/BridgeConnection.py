@@ -0,0 +1,183 @@
+# coding=utf-8
+
+import socket
+import threading
+
+from origin.engine.pubsub.Subscriber import Subscriber
+from origin.engine.pubsub.Topic import Topic
+
+
+#
+# A client of the TopicBridge. Subscribes to topics on the client's behalf and forwards their events from a writer
+# thread so the main loop never waits on the socket. Events are sent in batches of whatever has accumulated since
+# the last batch went out. A client that falls more than max_outbox events behind loses the oldest.
+#
+# Messages from the client are read on a reader thread and handed to the bridge to be carried out on the main loop,
+# which is the only thread that subscribes to or sends to topics on the connection's behalf.
+#
+class BridgeConnection(Subscriber):
+
+
+    max_outbox = 10000
+
+
+    def __init__(self, bridge, sock):
+
+        self.bridge = bridge
+        self.sock = sock
+        self.ready = threading.Condition()
+        self.outbox = []
+        self.errors = []
+        self.dropped = 0
+        self.closed = False
+
+
+    def start(self):
+
+        threading.Thread(name="topic-bridge-reader", target=self.__read, daemon=True).start()
+        threading.Thread(name="topic-bridge-writer", target=self.__write, daemon=True).start()
+
+
+    def close(self):
+
+        with self.ready:
+
+            if self.closed:
+                return
+
+            self.closed = True
+            self.ready.notify()
+
+        # Shut down first so a reader thread blocked on the socket wakes and the client sees it close
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self.sock.close()
+
+        # Unsubscribed on the main loop
+        self.bridge.disconnected(self)
+
+
+    #
+    # Queue an event from a subscribed topic to be sent
+    #
+    def event(self, topicname, event):
+
+        with self.ready:
+
+            if len(self.outbox) >= BridgeConnection.max_outbox:
+                del self.outbox[0]
+                self.dropped += 1
+
+            self.outbox.append((topicname, event))
+            self.ready.notify()
+
+
+    def __refuse(self, reason):
+
+        with self.ready:
+            self.errors.append(reason)
+            self.ready.notify()
+
+
+    def __read(self):
+
+        try:
+
+            while True:
+
+                message = self.bridge.read_frame(self.sock)
+
+                if message is None:
+                    break
+
+                self.bridge.submit(self, message)
+
+        # A client that drops the connection or sends something malformed is disconnected
+        except (OSError, ValueError, TypeError):
+            pass
+
+        self.close()
+
+
+    #
+    # Carry out a message from the client. Runs on the main loop.
+    #
+    def handle(self, message):
+
+        if not isinstance(message, dict):
+            self.__refuse("Messages must be JSON objects.")
+            return
+
+        kinds = message.get("kinds")
+
+        for name in map(self.bridge.from_json, message.get("subscribe", ())):
+
+            if not self.bridge.bridged(name):
+                self.__refuse("Topic %r is not bridged." % (name,))
+                continue
+
+            # Per-object topics such as monitors only exist while somebody is subscribed to them
+            Topic.static_topic(name, transient=isinstance(name, tuple)).subscribe(self, kinds)
+
+        for name in map(self.bridge.from_json, message.get("unsubscribe", ())):
+
+            topic = Topic.topics.get(name)
+
+            if topic:
+                topic.unsubscribe(self)
+
+        for entry in message.get("publish", ()):
+
+            if not isinstance(entry, list) or len(entry) not in (2, 3):
+                self.__refuse("Publish entries must be [topic, event] or [topic, event, kind].")
+                continue
+
+            name = self.bridge.from_json(entry[0])
+            event = self.bridge.from_json(entry[1])
+
+            if not self.bridge.publishable(name):
+                self.__refuse("Topic %r can not be published to." % (name,))
+                continue
+
+            if not self.bridge.valid_event(name, event):
+                self.__refuse("Event %r is not of the form topic %r expects." % (event, name))
+                continue
+
+            # As with monitors there's no need to send to a per-object topic nobody is subscribed to
+            topic = Topic.topics.get(name) if isinstance(name, tuple) else Topic.static_topic(name)
+
+            if topic:
+                topic.send(event, kind=entry[2] if len(entry) == 3 else None)
+
+
+    def __write(self):
+
+        while True:
+
+            with self.ready:
+
+                while not self.outbox and not self.errors and not self.closed:
+                    self.ready.wait()
+
+                if self.closed:
+                    break
+
+                events, self.outbox = self.outbox, []
+                errors, self.errors = self.errors, []
+
+            try:
+
+                frames = [self.bridge.encode({"error": reason}) for reason in errors]
+
+                if events:
+                    frames.append(self.bridge.encode({"events": events}))
+
+                self.sock.sendall(b"".join(frames))
+
+            except OSError:
+                break
+
+        self.close()
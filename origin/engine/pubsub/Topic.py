@@ -1,7 +1,11 @@
 # coding=utf-8
 
+import collections
+import itertools
+import sys
 import threading
 import time
+import traceback
 import weakref
 
 from origin.engine.pubsub.Subscriber import Subscriber
@@ -9,7 +13,21 @@ from origin.engine.pubsub.Subscriber import Subscriber
 
 #
 # Represents a topic which may be subscribed to to send and receive events.
-# Topics are provided by the static_topic function.
+# Topics are provided by the static_topic function. Transient topics are destroyed once their last subscriber is gone,
+# the next time all topics are synced on the main loop.
+#
+# Events may be sent with a kind, e.g., "arrival", and subscribers may ask for only certain kinds of event and/or
+# those a predicate holds true for. Subscribers are indexed by the kinds they want so an event is only handed to
+# those interested in it and one nobody wants isn't queued at all.
+#
+# Each topic queues at most max_events between syncs. What happens to an event sent to a full topic depends on the
+# topic's overflow policy:
+#
+# "drop-oldest"    - the oldest queued event is dropped to make room
+# "drop-newest"    - the event being sent is dropped
+# "coalesce"       - the event replaces the queued event with the same coalesce_key, if any, else the oldest is dropped
+# "block-producer" - the sender waits until the topic is synced. The thread that syncs the topic never waits since it
+#                    would wait forever so its events are queued regardless.
 #
 class Topic(object):
 
@@ -17,13 +35,44 @@ class Topic(object):
     topics = {}
     __lock = threading.Lock()
 
+    policies = ("drop-oldest", "drop-newest", "coalesce", "block-producer")
+
+    # Queue limits, see set_limits(). Limits and policies are keyed by topic name or the first part of a tuple name.
+    default_max_events = 1000
+    default_policy = "drop-oldest"
+    topic_limits = {}
+    topic_policies = {}
+
+    # Topics with queued events. Only these are visited when all topics are synced.
+    dirty = set()
+    __dirty_lock = threading.Lock()
+    __serial = itertools.count()
+
+    # (topic, subscriber ref or None) for subscribers gone since the last sync. Garbage collection may happen on any
+    # thread, even one holding a topic lock, so whatever it frees is only noted here and tidied up by static_sync.
+    departures = collections.deque()
+
 
-    def __init__(self, name):
+    def __init__(self, name, transient=False):
 
         self.name = name
+        self.transient = transient
         self.subscribers = set()
-        self.events = []
+        self.filters = {}                                   # subscriber ref -> (kinds or None for all, predicate)
+        self.routes = {}                                    # kind -> ((subscriber ref, predicate), ...)
+        self.everything = ()                                # (subscriber ref, predicate) for those wanting all kinds
+        self.events = collections.deque()                  # (kind, event)
         self.last_event = time.time()
+        self.is_dirty = False
+        self.order = next(Topic.__serial)
+
+        # Overflow handling and the counters reported by the 'subscriptions' Sysop action
+        self.max_events, self.policy = Topic.limits_for(name)
+        self.dropped = 0
+        self.high_water = 0
+        self.latest = {}                                    # coalesce key -> queued [event, key] slot
+        self.not_full = threading.Condition()               # also guards events and latest against other threads
+        self.consumer = threading.main_thread().ident       # thread that syncs the topic and so mustn't block
 
 
     @property
@@ -34,54 +83,221 @@ class Topic(object):
     def destroy(self):
 
         self.sync()
-        del Topic.topics[self.name]
+
+        with Topic.__dirty_lock:
+            Topic.dirty.discard(self)
+
+        with Topic.__lock:
+            if Topic.topics.get(self.name) is self:
+                del Topic.topics[self.name]
+
+        # Emptied rather than deleted since a sender may have looked the topic up just before it was destroyed
         self.name = "<defunct>"
-        del self.subscribers
-        del self.events
+        self.subscribers = set()
+        self.filters = {}
+        self.routes = {}
+        self.everything = ()
+        self.events = collections.deque()
 
 
-    def subscribe(self, subscriber):
+    #
+    # Subscribe to the topic. Given kinds, a kind or an iterable of them, only events sent with one of those kinds are
+    # received. Given a predicate only events it returns True for are received. Subscribing again replaces the filter.
+    #
+    def subscribe(self, subscriber, kinds=None, predicate=None):
 
         if not isinstance(subscriber, Subscriber):
             raise TypeError("subscriber needs to be a Subscriber")
 
-        self.subscribers.add(weakref.ref(subscriber))
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+
+        subber_ref = weakref.ref(subscriber, self.__subscriber_gone)
+
+        self.subscribers.add(subber_ref)
+        self.filters[subber_ref] = (frozenset(kinds) if kinds is not None else None, predicate)
+        self.__index()
 
 
     def unsubscribe(self, subscriber):
 
-        self.subscribers.discard(weakref.ref(subscriber))
+        subber_ref = weakref.ref(subscriber)
+
+        self.subscribers.discard(subber_ref)
+        self.filters.pop(subber_ref, None)
+        self.__index()
+
+        if self.transient and not self.subscribers:
+            Topic.departures.append((self, None))
+
+
+    #
+    # Rebuild the kind -> subscribers index. The routes are replaced rather than changed so a sync in progress keeps
+    # the ones it started with.
+    #
+    def __index(self):
+
+        everything = tuple((ref, predicate) for ref, (kinds, predicate) in self.filters.items() if kinds is None)
+        routes = {}
+
+        for ref, (kinds, predicate) in self.filters.items():
+            for kind in kinds or ():
+                routes.setdefault(kind, list(everything)).append((ref, predicate))
 
+        self.routes = {kind: tuple(route) for kind, route in routes.items()}
+        self.everything = everything
 
-    def send(self, event, synchronous=False):
 
-        self.events.append(event)
+    #
+    # Called when a subscriber is garbage collected without having unsubscribed
+    #
+    def __subscriber_gone(self, subscriber_ref):
+        Topic.departures.append((self, subscriber_ref))
+
+
+    #
+    # Forget the subscribers gone since the last sync and destroy transient topics left without any. Runs on the
+    # main loop.
+    #
+    @staticmethod
+    def __tidy():
+
+        while Topic.departures:
+
+            topic, subscriber_ref = Topic.departures.popleft()
+
+            if topic.name == "<defunct>":
+                continue
+
+            if subscriber_ref is not None:
+                topic.subscribers.discard(subscriber_ref)
+                topic.filters.pop(subscriber_ref, None)
+                topic.__index()
+
+            if topic.transient and not topic.subscribers:
+                topic.destroy()
+
+
+    def send(self, event, synchronous=False, kind=None):
+
+        # Nobody subscribed wants this kind of event, or a transient topic is waiting to be destroyed
+        if (self.subscribers or self.transient) and not self.routes.get(kind, self.everything):
+            return [] if synchronous else None
+
+        entry = (kind, event)
+
+        with self.not_full:
+
+            if len(self.events) < self.max_events or self.__make_room(entry):
+
+                if self.policy == "coalesce":
+                    key = Topic.coalesce_key(entry)
+                    self.latest[key] = slot = [entry, key]
+                    self.events.append(slot)
+                else:
+                    self.events.append(entry)
+
+                self.high_water = max(self.high_water, len(self.events))
+
         self.last_event = time.time()
 
+        # The event is queued before the topic is marked so a sync clearing the mark always finds it
+        if not self.is_dirty:
+            with Topic.__dirty_lock:
+                self.is_dirty = True
+                Topic.dirty.add(self)
+
         if synchronous:
             return self.sync()
 
 
+    #
+    # Apply the overflow policy to a full topic, holding its lock. Returns True if the event should still be queued.
+    #
+    def __make_room(self, entry):
+
+        if self.policy == "drop-newest":
+            self.dropped += 1
+            return False
+
+        if self.policy == "coalesce":
+
+            slot = self.latest.get(Topic.coalesce_key(entry))
+
+            if slot:
+                slot[0] = entry
+                self.dropped += 1
+                return False
+
+        if self.policy == "block-producer":
+
+            if threading.get_ident() != self.consumer:
+                with self.not_full:
+                    while len(self.events) >= self.max_events:
+                        self.not_full.wait(1.0)
+
+            return True
+
+        # Drop the oldest queued event
+        try:
+            oldest = self.events.popleft()
+        except IndexError:
+            return True
+
+        if self.policy == "coalesce" and self.latest.get(oldest[1]) is oldest:
+            del self.latest[oldest[1]]
+
+        self.dropped += 1
+
+        return True
+
+
+    #
+    # Coalesced events are keyed by their kind and the first part of a tuple event, e.g., the sender of a monitor
+    # message
+    #
+    @staticmethod
+    def coalesce_key(entry):
+
+        kind, event = entry
+
+        return kind, (event[0] if isinstance(event, tuple) and event else event)
+
+
     def sync(self):
 
-        events, self.events = self.events, []
+        with self.not_full:
+
+            events, self.events = self.events, collections.deque()
+            policy = self.policy
+
+            if policy == "coalesce":
+                self.latest = {}
+
+            elif policy == "block-producer":
+                self.consumer = threading.get_ident()
+                self.not_full.notify_all()
+
+        if policy == "coalesce":
+            events = [slot[0] for slot in events]
+
         results = []
 
-        for event in events:
-            results.extend(self.__sync_event(event))
+        for kind, event in events:
+            results.extend(self.__sync_event(kind, event))
 
         return results
 
 
-    def __sync_event(self, event):
+    def __sync_event(self, kind, event):
 
         results = []
 
-        for subber_ref in self.subscribers:
+        for subber_ref, predicate in self.routes.get(kind, self.everything):
 
             subber = subber_ref()
 
-            if subber is not None:
+            if subber is not None and (predicate is None or predicate(event)):
 
                 try:
                     result = subber.event(self.name, event)
@@ -90,6 +306,12 @@ class Topic(object):
                 except Subscriber.defer:
                     pass
 
+                # One subscriber failing shouldn't cost the others their events or stop the main loop
+                except Exception:
+                    print("\n* Exception while delivering an event of topic %r to %r:" % (self.name, subber),
+                          file=sys.stderr)
+                    traceback.print_exc()
+
         return results
 
 
@@ -97,20 +319,21 @@ class Topic(object):
     # Create a topic object as a singleton. Name should be either a string or a tuple.
     #
     @staticmethod
-    def static_topic(name):
+    def static_topic(name, transient=False):
 
         with Topic.__lock:
 
             if name in Topic.topics:
                 return Topic.topics[name]
 
-            instance = Topic.topics[name] = Topic(name)
+            instance = Topic.topics[name] = Topic(name, transient)
 
             return instance
 
 
     #
-    # Push all pending events to subscribers.
+    # Push all pending events to subscribers. Without a topic only those with queued events are synced, in the order
+    # the topics were created.
     #
     @staticmethod
     def static_sync(topic=None):
@@ -121,19 +344,71 @@ class Topic(object):
 
         else:
 
-            for t in list(Topic.topics.values()):
-                t.sync()
+            Topic.__tidy()
+
+            with Topic.__dirty_lock:
+
+                dirty, Topic.dirty = Topic.dirty, set()
+
+                for t in dirty:
+                    t.is_dirty = False
+
+            for t in sorted(dirty, key=lambda t: t.order):
+
+                # Skip any topic destroyed by an event synced before it
+                if Topic.topics.get(t.name) is t:
+                    t.sync()
 
 
     #
-    # Returns a dictionary containing a topic's current count of pending events, idle time, and number of subscribers
+    # Returns a dictionary containing a topic's current count of pending events, idle time, number of subscribers,
+    # overflow policy, events dropped, and the most events it has had queued
     #
     @staticmethod
     def pending(topicname=None):
 
         with Topic.__lock:
             topics = [Topic.topics[topicname]] if topicname else Topic.topics.values()
-            return {t.name: (len(t.events), t.idle_time, len(t.subscribers)) for t in topics}
+            return {t.name: (len(t.events), t.idle_time, len(t.subscribers), t.policy, t.dropped, t.high_water) for t in topics}
+
+
+    #
+    # The queue limit and overflow policy for a topic name as a tuple
+    #
+    @staticmethod
+    def limits_for(name):
+
+        key = name[0] if isinstance(name, tuple) else name
+
+        return Topic.topic_limits.get(key, Topic.default_max_events), Topic.topic_policies.get(key, Topic.default_policy)
+
+
+    #
+    # Set the most events a topic may queue and its overflow policy. Both default_max_events and default_policy may
+    # be overridden per topic, e.g., topic_policies={"tells": "block-producer"}. Applies to existing topics as well
+    # as those created later.
+    #
+    @staticmethod
+    def set_limits(default_max_events, default_policy="drop-oldest", topic_limits=None, topic_policies=None):
+
+        topic_limits = topic_limits or {}
+        topic_policies = topic_policies or {}
+
+        for policy in list(topic_policies.values()) + [default_policy]:
+            if policy not in Topic.policies:
+                raise ValueError("Unknown topic policy '%s'. Use one of: %s" % (policy, ", ".join(Topic.policies)))
+
+        Topic.default_max_events = default_max_events
+        Topic.default_policy = default_policy
+        Topic.topic_limits = dict(topic_limits)
+        Topic.topic_policies = dict(topic_policies)
+
+        with Topic.__lock:
+            for t in Topic.topics.values():
+
+                # Queued coalesced events are held differently so a busy topic keeps its policy until next time
+                if not t.events:
+                    t.max_events, t.policy = Topic.limits_for(t.name)
 
 
     #
@@ -0,0 +1,266 @@
+# coding=utf-8
+
+import collections
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+
+from origin.engine.pubsub.BridgeConnection import BridgeConnection
+from origin.engine.pubsub.Topic import Topic
+
+
+#
+# Forwards topics to and from other local processes over a UNIX domain socket, e.g., an external monitor or a
+# process taking on part of the game's work.
+#
+# Messages are JSON objects, each sent as a frame prefixed with its length as a four byte big endian integer.
+# A client sends any of:
+#
+#     {"subscribe": [<topic>, ...], "kinds": [<kind>, ...]}     kinds are optional, as for Topic.subscribe
+#     {"unsubscribe": [<topic>, ...]}
+#     {"publish": [[<topic>, <event>, <kind>], ...]}            kind is optional
+#
+# and receives the events of the topics it subscribed to, batched together with any others that are waiting to be
+# sent, along with an error for any message it sent that was refused:
+#
+#     {"events": [[<topic>, <event>], ...]}
+#     {"error": <reason>}
+#
+# Topic names that are tuples, e.g., ("monitor-location", "COPTIC CONVENT"), travel as lists and so do tuple events.
+# Only topics whose name, or the first part of it, is one of topics may be bridged. Events need to survive the trip
+# as JSON so the engine's own topics, whose events are callables, can only be watched and then only by the repr of
+# each event. Events published to a monitor topic must be [<sender>, <message>] as both are strings.
+#
+# Messages are read on each client's own thread but carried out on the main loop, which takes them from a queue
+# when woken. A client sending faster than the main loop keeps up waits for room in the queue. A client sending
+# something the topics can't take is disconnected.
+#
+class TopicBridge(object):
+
+
+    header = struct.Struct("!I")
+    max_frame = 1 << 24                 # largest frame accepted from a client
+    max_requests = 10000                # most client messages waiting for the main loop
+
+    # Topics the engine runs the events of so nothing from outside may be sent to them
+    engine_topics = frozenset(("actions", "tells", "dialogs", "completions"))
+
+    # Topics whose events are (sender, message) as Player.event expects
+    monitor_topics = frozenset(("monitor-creature", "monitor-location"))
+
+
+    def __init__(self, path, topics, wake=None):
+
+        self.path = path
+        self.topics = frozenset(topics)
+        self.wake = wake
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.listener = None
+        self.requests = queue.Queue(TopicBridge.max_requests)   # (connection, message)
+        self.closed = collections.deque()                       # connections to unsubscribe and forget
+
+
+    #
+    # Listen for clients on a background thread. A socket left behind by an earlier run is replaced.
+    #
+    def start(self):
+
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("The topic bridge requires UNIX domain sockets which this platform lacks.")
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen()
+
+        threading.Thread(name="topic-bridge", target=self.__accept, daemon=True).start()
+
+
+    def close(self):
+
+        if self.listener:
+            self.listener.close()
+            self.listener = None
+
+        with self.lock:
+            connections = list(self.connections)
+
+        for conn in connections:
+            conn.close()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+    #
+    # Whether a topic may be forwarded
+    #
+    def bridged(self, name):
+        return (name[0] if isinstance(name, tuple) else name) in self.topics
+
+
+    #
+    # Whether clients may send events to a topic
+    #
+    def publishable(self, name):
+        return self.bridged(name) and name not in TopicBridge.engine_topics
+
+
+    #
+    # Whether an event has the shape subscribers of a topic expect
+    #
+    @staticmethod
+    def valid_event(name, event):
+
+        if (name[0] if isinstance(name, tuple) else name) in TopicBridge.monitor_topics:
+            return isinstance(event, tuple) and len(event) == 2 and all(isinstance(part, str) for part in event)
+
+        return True
+
+
+    #
+    # Called on a connection's reader thread with a message from its client. The message is carried out by
+    # process_requests on the main loop.
+    #
+    def submit(self, conn, message):
+
+        self.requests.put((conn, message))
+
+        if self.wake:
+            self.wake()
+
+
+    #
+    # Called by a connection once it has closed, on whichever thread closed it. Never waits since that may be the
+    # main loop.
+    #
+    def disconnected(self, conn):
+
+        self.closed.append(conn)
+
+        if self.wake:
+            self.wake()
+
+
+    #
+    # Carry out the messages clients have sent since the last call. Runs on the main loop.
+    #
+    def process_requests(self):
+
+        while True:
+
+            try:
+                conn, message = self.requests.get_nowait()
+            except queue.Empty:
+                break
+
+            # Anything a client sent after it closed is ignored
+            if conn.closed:
+                continue
+
+            try:
+                conn.handle(message)
+            except Exception:
+                conn.close()
+
+        while self.closed:
+
+            conn = self.closed.popleft()
+            Topic.unsubscribe_all(conn)
+
+            with self.lock:
+                self.connections.discard(conn)
+
+
+    #
+    # Returns a dictionary of the number of clients connected and the events dropped because they fell behind
+    #
+    def stats(self):
+
+        with self.lock:
+            connections = list(self.connections)
+
+        return {"connections": len(connections), "dropped": sum(conn.dropped for conn in connections)}
+
+
+    def __accept(self):
+
+        while self.listener:
+
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                break
+
+            conn = BridgeConnection(self, sock)
+
+            with self.lock:
+                self.connections.add(conn)
+
+            conn.start()
+
+
+    #
+    # Topic names and events arrive as lists where they were sent as tuples
+    #
+    @staticmethod
+    def from_json(value):
+        return tuple(value) if isinstance(value, list) else value
+
+
+    #
+    # Frame a message to be sent
+    #
+    @staticmethod
+    def encode(message):
+
+        body = json.dumps(message, separators=(",", ":"), default=repr).encode("utf-8")
+
+        return TopicBridge.header.pack(len(body)) + body
+
+
+    #
+    # Read the next message from a socket. Returns None once the other end has closed the connection.
+    #
+    @staticmethod
+    def read_frame(sock):
+
+        header = TopicBridge.__read_exactly(sock, TopicBridge.header.size)
+
+        if header is None:
+            return None
+
+        length, = TopicBridge.header.unpack(header)
+
+        if length > TopicBridge.max_frame:
+            raise ValueError("Frame of %d bytes is too large" % length)
+
+        body = TopicBridge.__read_exactly(sock, length)
+
+        if body is None:
+            return None
+
+        return json.loads(body.decode("utf-8"))
+
+
+    @staticmethod
+    def __read_exactly(sock, count):
+
+        data = bytearray()
+
+        while len(data) < count:
+
+            chunk = sock.recv(count - len(data))
+
+            if not chunk:
+                return None
+
+            data.extend(chunk)
+
+        return bytes(data)
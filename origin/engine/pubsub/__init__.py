@@ -11,6 +11,10 @@ We use weakrefs so as to avoid unnecessary locking of topics and
 subscribers in memory. Topics can be subscribed to but the engine
 is responsible for firing the events. 
 
+Topics may also be forwarded to and from other local processes over
+a UNIX domain socket by the TopicBridge. See topic_bridge_path in the
+game config.
+
 Topics available:
 
   "actions"
@@ -27,10 +31,16 @@ Topics available:
       to revisit this implementation with the introduction of PEP525 --
       Asynchronous Generators.
 
+  "completions"
+      Futures of work run on the engine's offload pool. The callable
+      each one results in, if any, is run on the main loop.
+
   ("monitor-location", <location name>)
-      Used to monitor a location
+      Used to monitor a location. Events are sent with the kind of
+      message, one of Creature.message_kinds.
 
   ("monitor-creature", <creature name>)
-      Used to monitor a creature
+      Used to monitor a creature. Events are sent with the kind of
+      message as for locations.
       
 """
\ No newline at end of file
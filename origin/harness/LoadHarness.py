@@ -0,0 +1,279 @@
+# coding=utf-8
+
+#
+# Headless load harness. Boots the engine and game without an HTTP server, attaches synthetic players, and replays
+# a scripted mix of commands through the same input path the web client uses to measure how the engine scales.
+#
+# python3 -m origin.harness.LoadHarness --players 200 --commands 20000 --mix look:4,go:2,get:1,drop:1,say:2,yell:1
+#
+
+import argparse
+import gc
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import types
+
+from origin.engine.Engine import Engine
+from origin.engine.Histogram import Histogram
+from origin.engine.TickScheduler import TickScheduler
+from origin.harness.StubIo import StubIo
+from origin.objects.creatures.players.Player import Player
+from origin.objects.creatures.players.PlayerConnection import PlayerConnection
+from origin.objects.locations.Location import Location
+
+
+class LoadHarness(object):
+
+
+    default_mix = "look:4,go:2,get:1,drop:1,say:2,yell:1"
+    phases = ("flush", "input", "tells", "ticks")
+
+
+    def __init__(self, players=50, commands=5000, mix=default_mix, tick_time=0.1, spread=False, seed=None):
+
+        self.player_count = players
+        self.command_count = commands
+        self.mix = LoadHarness.parse_mix(mix)
+        self.tick_time = tick_time
+        self.spread = spread
+        self.random = random.Random(seed)
+        self.connections = []
+        self.timings = {phase: Histogram() for phase in LoadHarness.phases}
+        self.database = None
+        self.engine = None
+
+
+    #
+    # Parses a command mix of the form "look:4,go:2" into a list of (command, weight) tuples
+    #
+    @staticmethod
+    def parse_mix(mix):
+
+        result = []
+
+        for entry in mix.split(","):
+            command, _, weight = entry.partition(":")
+            result.append((command.strip(), int(weight or 1)))
+
+        return result
+
+
+    #
+    # Boot the engine and game and attach the synthetic players
+    #
+    def setup(self):
+
+        handle, self.database = tempfile.mkstemp(prefix="origin-load-", suffix=".db")
+        os.close(handle)
+
+        self.engine = Engine(database=self.database)
+
+        # Synthetic players type far faster than people so don't let the command throttle skew the results
+        config = self.engine.config
+        config.server_tick_time = self.tick_time
+        config.command_rate = float(sys.maxsize)
+        config.command_burst = sys.maxsize
+        config.command_queue_limit = sys.maxsize
+        self.engine.tick_scheduler = TickScheduler(self.tick_time, config.tick_policy, config.max_catch_up_ticks)
+
+        self.engine._init_game()
+
+        locations = self.locations() if self.spread else [config.player_start]
+
+        for number in range(self.player_count):
+            self.attach_player(LoadHarness.player_name(number), locations[number % len(locations)])
+
+        self.engine.tick_scheduler.start(time.time())
+
+
+    #
+    # Account names may only contain letters so synthetic players are numbered in base 26: loadaaaa, loadaaab, ...
+    #
+    @staticmethod
+    def player_name(number):
+
+        letters = ""
+
+        for _ in range(4):
+            number, digit = divmod(number, 26)
+            letters = chr(ord("a") + digit) + letters
+
+        return "load" + letters
+
+
+    #
+    # All locations in the game's regions
+    #
+    def locations(self):
+
+        regions = [module for module in vars(self.engine.regions).values() if isinstance(module, types.ModuleType)]
+
+        return [obj for region in regions for obj in vars(region).values()
+                if isinstance(obj, Location) and obj is not Location.void()]
+
+
+    #
+    # Attach a signed in synthetic player in much the way Engine._connect and Engine._login would
+    #
+    def attach_player(self, name, location):
+
+        conn = PlayerConnection()
+        conn.player = Player(name, "f", "a synthetic player", "a synthetic player")
+        conn.player.connection = conn
+        conn.io = StubIo(conn)
+
+        self.engine.accounts.create(name, "synthetic1", "load@localhost", "f", location)
+        self.engine.all_players[name] = conn
+        self.connections.append(conn)
+
+        conn.player.move(location, silent=True)
+
+
+    #
+    # Choose the next command for a player according to the mix
+    #
+    def next_command(self, player):
+
+        commands, weights = zip(*self.mix)
+        command = self.random.choices(commands, weights)[0]
+
+        if command == "go":
+            exits = list(player.location.exits)
+            return self.random.choice(exits) if exits else "look"
+
+        if command == "get":
+            items = [item.name for item in player.location.items]
+            return "get " + self.random.choice(items) if items else "inventory"
+
+        if command == "drop":
+            items = [item.name for item in player.inventory]
+            return "drop " + self.random.choice(items) if items else "inventory"
+
+        if command == "say":
+            return "say hello everyone"
+
+        if command == "yell":
+            return "yell is anybody there"
+
+        return command
+
+
+    #
+    # Run one pass of the engine main loop, timing each phase
+    #
+    def run_loop(self):
+
+        engine = self.engine
+
+        for phase, work in (("flush", engine._flush_output),
+                            ("input", engine._process_input),
+                            ("tells", engine._sync_tells),
+                            ("ticks", engine._process_ticks)):
+
+            start = time.perf_counter()
+            work()
+            self.timings[phase].record(time.perf_counter() - start)
+
+
+    #
+    # Feed every player one command per loop until the command budget is spent then let the engine drain
+    #
+    def run(self):
+
+        gc.collect()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        objects_before = len(gc.get_objects())
+
+        sent = 0
+        start = time.perf_counter()
+
+        while sent < self.command_count:
+
+            for conn in self.connections:
+
+                if sent >= self.command_count:
+                    break
+
+                conn.player.store_input_line(self.next_command(conn.player))
+                sent += 1
+
+            self.run_loop()
+
+        while any(conn.player.input_queue_depth for conn in self.connections):
+            self.run_loop()
+
+        self.run_loop()
+        elapsed = time.perf_counter() - start
+
+        gc.collect()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        objects_after = len(gc.get_objects())
+
+        return {
+            "players": self.player_count,
+            "commands": sent,
+            "elapsed": elapsed,
+            "loops": self.timings["input"].count,
+            "rss_growth": rss_after - rss_before,
+            "object_growth": objects_after - objects_before,
+            "output_bytes": sum(conn.io.bytes_sent for conn in self.connections)
+        }
+
+
+    def teardown(self):
+
+        if self.engine and self.engine.journal:
+            self.engine.journal.close(self.engine.game_clock.clock)
+
+        # The deferred journal puts the database in write-ahead log mode so there may be companion files too
+        for path in (self.database, self.database + "-wal", self.database + "-shm") if self.database else ():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+    def report(self, results):
+
+        print("Players         : %d" % results["players"])
+        print("Commands        : %d in %.2f sec (%.0f commands/sec)" % (
+            results["commands"], results["elapsed"], results["commands"] / results["elapsed"]))
+        print("Loops           : %d" % results["loops"])
+        print("Output          : %d bytes" % results["output_bytes"])
+        print("Memory growth   : %d KB max RSS, %+d objects" % (results["rss_growth"], results["object_growth"]))
+        print("Loop latency    :      p50      p95      p99      max  (ms)")
+        LoadHarness.report_timings(self.timings)
+        print("Engine phases   :      p50      p95      p99      max  (ms)")
+        LoadHarness.report_timings(self.engine.phase_timings)
+
+
+    @staticmethod
+    def report_timings(timings):
+
+        for phase, histogram in timings.items():
+            print("  %-13s : %8.3f %8.3f %8.3f %8.3f" % (
+                phase, *(1000 * histogram.percentile(f) for f in (0.5, 0.95, 0.99)), 1000 * histogram.max))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Headless load harness for the ORIGIN game engine")
+    parser.add_argument("--players", type=int, default=50, help="number of synthetic players")
+    parser.add_argument("--commands", type=int, default=5000, help="total number of commands to replay")
+    parser.add_argument("--mix", default=LoadHarness.default_mix, help="weighted command mix, e.g. look:4,go:2")
+    parser.add_argument("--tick", type=float, default=0.1, help="server tick time in seconds")
+    parser.add_argument("--spread", action="store_true", help="spread players across all locations")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for repeatable runs")
+    args = parser.parse_args()
+
+    harness = LoadHarness(args.players, args.commands, args.mix, args.tick, args.spread, args.seed)
+
+    try:
+        harness.setup()
+        harness.report(harness.run())
+    finally:
+        harness.teardown()
+
+    raise SystemExit(0)
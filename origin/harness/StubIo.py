@@ -0,0 +1,44 @@
+# coding=utf-8
+
+
+#
+# Stand-in for HttpIo used by synthetic players. Output is counted rather than sent anywhere.
+#
+class StubIo(object):
+
+
+    def __init__(self, player_connection):
+
+        self.player_connection = player_connection
+        self.last_output_line = None
+        self.dont_echo_next = False
+        self.lines_sent = 0
+        self.bytes_sent = 0
+
+
+    def destroy(self):
+        pass
+
+
+    def clear_screen(self):
+        self.dont_echo_next = True
+
+
+    def render_output(self, paragraphs, **params):
+        for text in paragraphs:
+            self.output_no_newline(text)
+
+
+    def output(self, *lines):
+        for line in lines:
+            self.output_no_newline(line)
+
+
+    def output_no_newline(self, text):
+        self.last_output_line = text
+        self.lines_sent += 1
+        self.bytes_sent += len(text)
+
+
+    def critical_error(self):
+        pass
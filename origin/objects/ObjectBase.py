@@ -172,7 +172,7 @@ class ObjectBase(object):
     # Register an object to receive heartbeats. Prefer defereds when possible.
     #
     def register_heartbeat(self):
-        context.engine.register_heartbeat(self)
+        context.engine.register_heartbeat(self, getattr(self, "_heartbeat_period", 1))
 
 
     #
@@ -187,6 +187,14 @@ class ObjectBase(object):
     def heartbeat(self, ctx):
         pass
 
+
+    #
+    # Called when a player enters the object's region after it sat empty with the object's deferreds or heartbeat
+    # parked. Dormant is the game time that passed. Override to fast-forward whatever the object would have done.
+    #
+    def catch_up(self, dormant, ctx):
+        pass
+
     #
     # Called via the Activate action. Override if the object should respond.
     #
@@ -274,13 +282,22 @@ class ObjectBase(object):
     #
     # Decorator indicating that instances of a class should respond to heartbeats.
     # Deferreds are preferrable for performance reasons whereas heartbeats process at
-    # least minimally on every tick.
+    # least minimally on every tick they're due.
+    #
+    # Use it bare to receive a heartbeat every server tick or give a period in ticks:
+    #
+    # @ObjectBase.heartbeat
+    # @ObjectBase.heartbeat(every=10)
     #
     @staticmethod
-    def heartbeat(cls):
+    def heartbeat(cls=None, every=1):
+
+        def register(cls):
+            cls._register_heartbeat = True
+            cls._heartbeat_period = every
+            return cls
 
-        cls._register_heartbeat = True
-        return cls
+        return register(cls) if isinstance(cls, type) else register
 
 
     #
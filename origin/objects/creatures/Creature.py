@@ -19,6 +19,10 @@ from origin.parser.Parser import Parser
 class Creature(ObjectBase):
 
 
+    # Kinds of message a creature or location may be told which a Sysop may choose to monitor
+    message_kinds = ("message", "say", "emote", "arrival", "departure")
+
+
     def __init__(self, name, gender, title=None, description=None, short_description=None):
 
         # TODO: Uncertain why this import must happen within __init__
@@ -122,7 +126,7 @@ class Creature(ObjectBase):
         duplicate = ObjectBase.clone(self)
         actor.tell("Creature cloned to " + repr(duplicate))
         actor.location.insert(duplicate, actor)
-        actor.location.tell("%s appears." % Lang.capital(duplicate.title))
+        actor.location.tell("%s appears." % Lang.capital(duplicate.title), kind="arrival")
         return duplicate
 
 
@@ -151,22 +155,25 @@ class Creature(ObjectBase):
 
 
     #
-    # Monitor the creature's behavior
+    # Monitor the creature's behavior. The topic only exists while a Sysop is monitoring the creature.
     #
     def get_monitor(self):
 
-        return Topic.static_topic(("monitor-creature", self.name))
+        return Topic.static_topic(("monitor-creature", self.name), transient=True)
 
 
     #
     # Every creature can receive messages. In the case of players messages are transmitted to their client.
-    # The default for NPC creatures is to ignore any messages they receive.
+    # The default for NPC creatures is to ignore any messages they receive. The kind of message, one of
+    # message_kinds, lets those monitoring the creature pick what they see.
     #
-    def tell(self, *messages):
+    def tell(self, *messages, kind="message"):
+
+        # Only pay for a message nobody reads if someone is monitoring the creature
+        tap = Topic.topics.get(("monitor-creature", self.name))
 
-        msg = " ".join(str(msg) for msg in messages)
-        tap = self.get_monitor()
-        tap.send((self.name, msg))
+        if tap:
+            tap.send((self.name, " ".join(str(msg) for msg in messages)), kind=kind)
 
 
     #
@@ -180,12 +187,12 @@ class Creature(ObjectBase):
     # Send one or more messages to other creatures in this creature's location
     # {title}/{Title} can be used to conveniently insert an object's title
     #
-    def tell_others(self, *messages):
+    def tell_others(self, *messages, kind="message"):
 
         formats = {"title": self.title, "Title": Lang.capital(self.title)}
         for msg in messages:
             msg = msg.format(**formats)
-            self.location.tell(msg, exclude_creature=self)
+            self.location.tell(msg, exclude_creature=self, kind=kind)
 
 
     def parse(self, actionline, external_verbs=frozenset()):
@@ -281,7 +288,7 @@ class Creature(ObjectBase):
 
             # Allow for the scneario where a creature silently disappears.
             if not silent:
-                original_location.tell("%s leaves." % Lang.capital(self.title), exclude_creature=self)
+                original_location.tell("%s leaves." % Lang.capital(self.title), exclude_creature=self, kind="departure")
 
             if is_player:
                 ObjectBase.pending_actions.send(lambda who=self, where=target: original_location.notify_player_left(who, where))
@@ -293,7 +300,7 @@ class Creature(ObjectBase):
             target.insert(self, actor)
 
         if not silent:
-            target.tell("%s arrives." % Lang.capital(self.title), exclude_creature=self)
+            target.tell("%s arrives." % Lang.capital(self.title), exclude_creature=self, kind="arrival")
 
         # queue event
         if is_player:
@@ -45,7 +45,9 @@ class Player(Creature, Subscriber):
 
         self._input = queue.Queue()
         self.input_is_available = Event()
-        self._output = TextBuffer()
+        self.dropped_commands = 0
+        self._output = TextBuffer(self._output_pending)
+        self.connection = None
 
 
     def __getstate__(self):
@@ -57,7 +59,7 @@ class Player(Creature, Subscriber):
 
         # TODO: It's unclear we'll need to serialize given our reliance on database for future game save functionality
 
-        for name in ["_input", "_output", "input_is_available"]:
+        for name in ["_input", "_output", "input_is_available", "connection"]:
             del state[name]
 
         return state
@@ -79,9 +81,9 @@ class Player(Creature, Subscriber):
     # Sends one or more messages to a player via. Output is buffered for efficiency.
     # Empty messages will not be sent. The player object is returned to support call chaining.
     #
-    def tell(self, *messages):
+    def tell(self, *messages, kind="message"):
 
-        super(Player, self).tell(*messages)
+        super(Player, self).tell(*messages, kind=kind)
 
         if messages == ("\n",):
             self._output.new_paragraph()
@@ -92,6 +94,15 @@ class Player(Creature, Subscriber):
         return self
 
 
+    #
+    # Called by our output buffer whenever text is added so the engine will flush it to our connection
+    #
+    def _output_pending(self):
+
+        if self.connection:
+            context.engine.output_pending(self.connection)
+
+
     #
     # Responds to a player request to look around their surroundings.
     #
@@ -140,11 +151,14 @@ class Player(Creature, Subscriber):
         context.engine.accounts.update(account)
 
 
-    def create_monitor(self, target):
+    #
+    # Monitor a location or creature. Given kinds only those kinds of message are reported, e.g., ("arrival",).
+    #
+    def create_monitor(self, target, kinds=None):
         if not self.isSysOp:
             raise ActionRefused("monitor requires Sysop status")
         tap = target.get_monitor()
-        tap.subscribe(self)
+        tap.subscribe(self, kinds)
 
 
     #
@@ -167,32 +181,54 @@ class Player(Creature, Subscriber):
 
 
     #
-    # Return all data in the input buffer and clear the input is available flag assuming
-    # it will be dealt with and the buffer purged.
+    # Take the oldest line from the command queue, or None if it is empty. The input is available flag is cleared
+    # once the queue has been drained.
     #
-    def get_pending_input(self):
-
-        result = []
-        self.input_is_available.clear()
+    def get_input_line(self):
 
         try:
-            while True:
-                result.append(self._input.get_nowait())
+            line = self._input.get_nowait()
         except queue.Empty:
-            return result
+            line = None
+
+        if self._input.empty():
+
+            self.input_is_available.clear()
+
+            # A line may have arrived between checking the queue and clearing the flag
+            if not self._input.empty():
+                self.input_is_available.set()
+
+        return line
 
 
     #
-    # Add a line of text to the input buffer
+    # Add a line of text to the command queue. Lines beyond the configured queue limit are dropped and counted.
     #
     def store_input_line(self, action):
 
         action = action.strip()
+
+        if self._input.qsize() >= context.config.command_queue_limit:
+            self.dropped_commands += 1
+            return
+
         self._input.put(action)
 
         self.input_is_available.set()
         self.last_input_time = time.time()
 
+        # Queue our connection with the engine so it only needs to visit players with work to do
+        context.engine.input_ready(self.connection)
+
+
+    #
+    # Number of commands waiting to be processed
+    #
+    @property
+    def input_queue_depth(self):
+        return self._input.qsize()
+
 
     @property
     def idle_time(self):
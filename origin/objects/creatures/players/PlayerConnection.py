@@ -1,7 +1,10 @@
 # coding=utf-8
 
+import time
+
 from origin import context
 from origin.engine.Context import Context
+from origin.engine.TokenBucket import TokenBucket
 
 
 #
@@ -15,6 +18,9 @@ class PlayerConnection(object):
         self.player = player
         self.io = io
 
+        # Meters how quickly the player's queued commands are processed
+        self.command_bucket = TokenBucket(context.config.command_rate, context.config.command_burst, time.time())
+
 
     #
     # Retrieves pending output, formats it if applicable, then clears the buffer.
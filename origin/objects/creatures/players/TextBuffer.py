@@ -15,7 +15,11 @@ class TextBuffer(object):
         def text(self):
             return "\n".join(self.lines) + "\n"
 
-    def __init__(self):
+    #
+    # on_write is called whenever text is added to the buffer so its owner can arrange for it to be flushed
+    #
+    def __init__(self, on_write=None):
+        self.on_write = on_write
         self.init()
 
     def init(self):
@@ -28,6 +32,8 @@ class TextBuffer(object):
         if not self.in_paragraph:
             self.__new_paragraph()
         self.in_paragraph = False
+        if self.on_write:
+            self.on_write()
 
 
     def __new_paragraph(self):
@@ -51,6 +57,9 @@ class TextBuffer(object):
         line = line.strip()
         p.add(line)
 
+        if self.on_write:
+            self.on_write()
+
 
     def get_paragraphs(self, clear=True):
         paragraphs = [p.text() for p in self.paragraphs]
@@ -104,18 +104,18 @@ class Location(ObjectBase):
 
 
     #
-    # Provides a monitor for this location.
+    # Provides a monitor for this location. The topic only exists while a Sysop is monitoring the location.
     #
     def get_monitor(self):
-        return Topic.static_topic(("monitor-location", self.name))
+        return Topic.static_topic(("monitor-location", self.name), transient=True)
 
 
     #
     # Broadcasts a message to all creatures in the room except those indicated by exclude_creature.
     # This should only be used for messaging. Generally, use process_action and notify_action instead.
-    # Objects monitoring activity in a room are also notified.
+    # Objects monitoring activity in a room are also notified. The kind is one of Creature.message_kinds.
     #
-    def tell(self, room_msg, exclude_creature=None, specific_targets=None, specific_target_msg=""):
+    def tell(self, room_msg, exclude_creature=None, specific_targets=None, specific_target_msg="", kind="message"):
 
         specific_targets = specific_targets or set()
         assert isinstance(specific_targets, (frozenset, set, list, tuple))
@@ -132,14 +132,15 @@ class Location(ObjectBase):
 
             # Send specific objects get specific messages we'll handle that condition as well
             if creature in specific_targets:
-                creature.tell(specific_target_msg)
+                creature.tell(specific_target_msg, kind=kind)
             else:
-                creature.tell(room_msg)
+                creature.tell(room_msg, kind=kind)
 
         # Send the room message to any objects monitoring room activity
         if room_msg:
-            monitor = self.get_monitor()
-            monitor.send((self.name, room_msg))
+            monitor = Topic.topics.get(("monitor-location", self.name))
+            if monitor:
+                monitor.send((self.name, room_msg), kind=kind)
 
 
     #
@@ -2,17 +2,19 @@
 
 import ssl
 import json
+import math
+import time
 
 from html import escape as html_escape
 from urllib.parse import parse_qs
 
-from wsgiref.simple_server import make_server
-
 from origin.server.Session import Session
 from origin.common.errors.SessionClose import SessionClose
 from origin.server.SessionFactory import SessionFactory
-from origin.server.AsyncWsgiServer import AsyncWsgiServer
-from origin.server.NoLoggingRequestHandler import NoLoggingRequestHandler
+from origin.server.WebSocket import WebSocket
+from origin.server.PooledWsgiServer import PooledWsgiServer
+from origin.server.AsyncioWsgiServer import AsyncioWsgiServer
+from origin.server.WebSocketRequestHandler import WebSocketRequestHandler
 
 
 #
@@ -21,6 +23,13 @@ from origin.server.NoLoggingRequestHandler import NoLoggingRequestHandler
 #
 class App(object):
 
+    # Experimental SSL support
+    certfile = "/etc/certbot/live/host.domain.com/cert.pem"
+    keyfile = "/etc/certbot/live/host.domain.com/privkey.pem"
+    ca_certs = "/etc/certbot/live/host.domain.com/fullchain.pem"
+
+    max_content_length = int(1e6)   # largest POST body accepted
+
     def __init__(self, engine):
         self.engine = engine
 
@@ -45,7 +54,7 @@ class App(object):
 
             clength = int(environ["CONTENT_LENGTH"])
 
-            if clength > int(1e6):
+            if clength > App.max_content_length:
                 raise ValueError("Maximum content length of 1M exceeded.")
 
             inputstream = environ['wsgi.input']
@@ -63,6 +72,14 @@ class App(object):
             qs = environ.get("QUERY_STRING", "")
             parameters = self.delist_parameters(parse_qs(qs, encoding="UTF-8"))
 
+            # Output streamed as server-sent events over a single response
+            if path == "events":
+                return self._events(environ, parameters, start_response)
+
+            # Input and output both ways over a WebSocket
+            if path == "ws":
+                return self._websocket(environ, start_response)
+
             return self._output(environ, parameters, start_response)
 
         #
@@ -86,7 +103,16 @@ class App(object):
 
         # Get the action the user wants to perform. If the user is logging in this will contain the
         # username and password provided so 'action' is a bit of a misnomer is some edge cases.
-        action = parameters.get("input", "")
+        self.__store_input(conn, parameters.get("input", ""))
+
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return []
+
+    #
+    # Echo a line of input to the player's client and queue it for the engine
+    #
+    def __store_input(self, conn, action):
+
         action = html_escape(action, False)
 
         if action:
@@ -101,18 +127,107 @@ class App(object):
             # form is used to mask passwords.
             else:
                 conn.io.html_to_browser.append("<userinput>%s</userinput>" % action)
+                conn.io.notify()
 
             # Save the input to the player object associated with the connection
             conn.player.store_input_line(action)
 
-        start_response('200 OK', [('Content-Type', 'text/plain')])
-        return []
-
     #
     # Process user output as provided by any HTTP GET event. Player must be logged in or error 500 is returned.
     #
+    # When there's no output waiting the request is held open until there is some or long_poll_timeout seconds
+    # pass. The client may ask to wait for less, e.g., '?wait=0' to return at once.
+    #
     def _output(self, environ, parameters, start_response):
 
+        conn = self.__connection(environ)
+
+        # Insure the user is logged in.
+        if not conn:
+            return self.internal_server_error_500(start_response, "not logged in")
+
+        longest = self.engine.config.long_poll_timeout
+
+        try:
+            timeout = float(parameters.get("wait", longest))
+        except ValueError:
+            timeout = longest
+
+        # nan and inf would never time out, and nan compares false with everything so it gets past a clamp too
+        timeout = min(max(timeout, 0.0), longest) if math.isfinite(timeout) else longest
+
+        return self.__poll_output(environ, conn, conn.io, timeout, start_response)
+
+    #
+    # Stream output as server-sent events, one per flush of the player's output, until the player's connection
+    # closes. Each event's data is the JSON object a GET for output returns. Events are numbered so a client that
+    # reconnects with a Last-Event-ID header, as browsers do, is sent those it missed. Input is still POSTed.
+    #
+    def _events(self, environ, parameters, start_response):
+
+        conn = self.__connection(environ)
+
+        if not conn:
+            return self.internal_server_error_500(start_response, "not logged in")
+
+        try:
+            last_id = int(environ.get("HTTP_LAST_EVENT_ID") or parameters.get("last_event_id", 0))
+        except ValueError:
+            last_id = 0
+
+        if not self.__detach(environ):
+            return self.service_unavailable_503(start_response)
+
+        start_response('200 OK', [('Content-Type', 'text/event-stream; charset=utf-8'),
+                                  ('Cache-Control', 'no-cache, no-store, must-revalidate'),
+                                  ('X-Accel-Buffering', 'no')])
+
+        return self.__stream_output(environ, conn, conn.io, last_id)
+
+    #
+    # Play over a WebSocket. Each text message received is a line of input and each batch of output is sent as a text
+    # message holding the JSON object a GET for output returns.
+    #
+    # Both servers upgrade the connection themselves once the application answers with 101 Switching Protocols. They
+    # offer it by setting "origin.websocket" in the environ and expect "origin.websocket.receive" set in return to a
+    # callable taking each message, or None once the socket has closed. The response body is sent as messages.
+    #
+    def _websocket(self, environ, start_response):
+
+        if not environ.get("origin.websocket") or not WebSocket.is_upgrade(environ):
+            return self.bad_request_400(start_response, "WebSocket upgrade expected")
+
+        conn = self.__connection(environ)
+
+        if not conn:
+            return self.internal_server_error_500(start_response, "not logged in")
+
+        if not self.__detach(environ):
+            return self.service_unavailable_503(start_response)
+
+        closed = []
+
+        def receive(message):
+
+            if message is None:
+                closed.append(True)
+                conn.io.notify()
+
+            elif isinstance(message, str) and conn.player:
+                self.__store_input(conn, message)
+
+        environ["origin.websocket.receive"] = receive
+
+        start_response('101 Switching Protocols', WebSocket.handshake_headers(environ))
+
+        return self.__socket_output(environ, conn, conn.io, closed)
+
+    #
+    # The player connection of a request's session, created if this is a new session. Returns None if the session
+    # has none, e.g., after logging out.
+    #
+    def __connection(self, environ):
+
         session = environ["wsgi.session"]
 
         # Is this a new player session? If so store a new PlayerConnection object in the session via the
@@ -130,22 +245,126 @@ class App(object):
         else:
             conn = session.get("player_connection")
 
-        # Insure the user is logged in.
-        if not conn:
-            return self.internal_server_error_500(start_response, "not logged in")
-
         # If any resources associated with the connection aren't available
-        if not conn or not conn.player or not conn.io:
+        if conn and (not conn.player or not conn.io):
             raise SessionClose("{\"Notice\": \"This connection is no longer valid. Please try again.\"}", "application/json")
 
-        html, conn.io.html_to_browser = conn.io.html_to_browser, []
-        oob, conn.io.out_of_band = conn.io.out_of_band, []
+        return conn
+
+    #
+    # Ask the threaded server to let a request be held open without keeping one of its pool's workers, see
+    # PooledWsgiServer. Returns False if it has too many open already. The asyncio server holds requests open for
+    # next to nothing so doesn't offer "origin.detach".
+    #
+    @staticmethod
+    def __detach(environ):
+
+        detach = environ.get("origin.detach")
+
+        return detach is None or detach()
+
+    #
+    # Response body generator waiting up to timeout seconds for output before sending it. The threaded server runs
+    # it on the request's own thread so it simply blocks, unless it has too many requests held open in which case
+    # there's no waiting. The asyncio server must never block so there it yields an awaitable for the server to wait
+    # on instead.
+    #
+    def __poll_output(self, environ, conn, io, timeout, start_response):
+
+        deadline = time.monotonic() + timeout
+        suspend = environ.get("origin.suspend", False)
+
+        while not io.has_output:
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                break
+
+            if suspend:
+                yield io.wait_async(remaining)
+            elif self.__detach(environ):
+                io.wait(remaining)
+            else:
+                break
+
+        html, io.html_to_browser = io.html_to_browser, []
+        oob, io.out_of_band = io.out_of_band, []
 
         start_response('200 OK', [('Content-Type', 'application/json; charset=utf-8'),
                                   ('Cache-Control', 'no-cache, no-store, must-revalidate'),
                                   ('Pragma', 'no-cache'),
                                   ('Expires', '0')])
 
+        yield self.__output_response(conn, html, oob)
+
+    #
+    # Response body generator sending each batch of output as an event along with a comment every sse_keepalive
+    # seconds nothing happens so a client that has gone away is noticed. Waits the same way as __poll_output.
+    #
+    def __stream_output(self, environ, conn, io, last_id):
+
+        keepalive = self.engine.config.sse_keepalive
+        suspend = environ.get("origin.suspend", False)
+        format = lambda html, oob: self.__output_response(conn, html, oob)
+
+        # Have the browser reconnect promptly should the stream drop
+        yield b"retry: 1000\n\n"
+
+        while not io.closed:
+
+            events = io.take_events(last_id, format)
+
+            if events:
+                last_id = events[-1][0]
+                yield b"".join(b"id: %d\ndata: %s\n\n" % event for event in events)
+                continue
+
+            deadline = time.monotonic() + keepalive
+
+            while not io.has_output and time.monotonic() < deadline:
+                if suspend:
+                    yield io.wait_async(deadline - time.monotonic())
+                else:
+                    io.wait(deadline - time.monotonic())
+
+            if not io.has_output:
+                yield b": keep-alive\n\n"
+
+        yield b"event: close\ndata: {}\n\n"
+
+    #
+    # Response body generator sending output to a WebSocket as it's flushed until either the player's connection or
+    # the socket closes. Waits the same way as __poll_output.
+    #
+    def __socket_output(self, environ, conn, io, closed):
+
+        suspend = environ.get("origin.suspend", False)
+        format = lambda html, oob: self.__output_response(conn, html, oob)
+
+        # Start from the output not yet sent rather than replaying events streamed earlier
+        last_id = io.event_id
+
+        while not io.closed and not closed:
+
+            events = io.take_events(last_id, format)
+
+            if events:
+                last_id = events[-1][0]
+                for _, payload in events:
+                    yield payload
+                continue
+
+            if suspend:
+                yield io.wait_async(self.engine.config.sse_keepalive)
+            else:
+                io.wait(self.engine.config.sse_keepalive)
+
+    #
+    # The JSON body of a response to a GET for output
+    #
+    def __output_response(self, conn, html, oob):
+
         response = {"text": "\n".join(html)}
 
         # NOTE: This would be one way to handle sending state values that could be optionally
@@ -158,7 +377,41 @@ class App(object):
         if html and conn.player:
             response["oob"] = oob
 
-        return [json.dumps(response).encode("utf-8")]
+        return json.dumps(response).encode("utf-8")
+
+    #
+    #   The WSGI application both servers serve. Metrics are read by monitoring tools that don't keep cookies so
+    #   they're routed around the Session layer, which would otherwise create a session for every request.
+    #
+    @classmethod
+    def wsgi_app(cls, engine):
+
+        app = cls(engine)
+        session_app = Session(app, SessionFactory())
+
+        def dispatch(environ, start_response):
+
+            if environ.get("PATH_INFO", "").lstrip("/") == "metrics":
+                return app._metrics(environ, start_response)
+
+            return session_app(environ, start_response)
+
+        return dispatch
+
+    #
+    # Report engine performance metrics, including per-phase timing histograms, as JSON. Only clients whose address
+    # is in metrics_allow may read them. Others, and everyone while it's empty, are told there's nothing here.
+    #
+    def _metrics(self, environ, start_response):
+
+        if environ.get("REQUEST_METHOD") != "GET" or \
+                environ.get("REMOTE_ADDR") not in self.engine.config.metrics_allow:
+            return self.not_found_404(start_response)
+
+        start_response('200 OK', [('Content-Type', 'application/json; charset=utf-8'),
+                                  ('Cache-Control', 'no-cache, no-store, must-revalidate')])
+
+        return [json.dumps(self.engine.metrics()).encode("utf-8")]
 
     #
     #   Create a very simple WSGI server implementation and return it to the caller
@@ -166,30 +419,58 @@ class App(object):
     @classmethod
     def create_server(cls, engine):
 
-        wsgi_app = Session(cls(engine), SessionFactory())
-        wsgi_server = make_server(engine.config.host, engine.config.port, app=wsgi_app,
-                                  handler_class=NoLoggingRequestHandler, server_class=AsyncWsgiServer)
+        wsgi_app = cls.wsgi_app(engine)
+        wsgi_server = PooledWsgiServer((engine.config.host, engine.config.port), WebSocketRequestHandler,
+                                       engine.config.http_workers, engine.config.http_queue_limit,
+                                       engine.config.http_streams, engine.config.http_retry_after)
+        wsgi_server.set_app(wsgi_app)
 
         # Experimental SSL support
         if engine.config.ssl and engine.config.host != "localhost":
 
-            certfile = "/etc/certbot/live/host.domain.com/cert.pem"
-            keyfile = "/etc/certbot/live/host.domain.com/privkey.pem"
-            ca_certs = "/etc/certbot/live/host.domain.com/fullchain.pem"
-
             wsgi_server.socket = ssl.wrap_socket(
                 wsgi_server.socket,
-                certfile=certfile,  # path to certificate
-                keyfile=keyfile,
-                ca_certs=ca_certs,
+                certfile=cls.certfile,  # path to certificate
+                keyfile=cls.keyfile,
+                ca_certs=cls.ca_certs,
                 server_side=True)
 
         return wsgi_server
 
+    #
+    #   Create an HTTP server serving the same routes from the engine's asyncio event loop. Call start() on the
+    #   result from within the running loop.
+    #
+    @classmethod
+    def create_async_server(cls, engine):
+
+        wsgi_app = cls.wsgi_app(engine)
+        ssl_context = None
+
+        # Experimental SSL support
+        if engine.config.ssl and engine.config.host != "localhost":
+
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH, cafile=cls.ca_certs)
+            ssl_context.load_cert_chain(cls.certfile, cls.keyfile)
+
+        wsgi_server = AsyncioWsgiServer(engine.config.host, engine.config.port, wsgi_app, ssl_context)
+        wsgi_server.max_body_size = cls.max_content_length
+
+        return wsgi_server
+
     #
     # Super basic implementations of a few HTTP response codes we might need
     #
 
+    def bad_request_400(self, start_response, message=""):
+        start_response('400 Bad Request', [('Content-Type', 'text/plain')])
+        return [message.encode("utf-8")]
+
+    def service_unavailable_503(self, start_response):
+        start_response('503 Service Unavailable', [('Content-Type', 'text/plain'),
+                                                   ('Retry-After', str(self.engine.config.http_retry_after))])
+        return [b'Error 503: Server busy']
+
     def not_found_404(self, start_response):
         start_response('404 Not Found', [('Content-Type', 'text/plain')])
         return [b'Error 404: Not Found']
@@ -0,0 +1,355 @@
+# coding=utf-8
+
+import asyncio
+import http.client
+import inspect
+import io
+import sys
+import traceback
+
+from urllib.parse import unquote
+
+from origin.server.WebSocket import WebSocket
+
+
+#
+# A minimal HTTP/1.1 server running on an asyncio event loop that serves a WSGI application.
+# Requests are handled as coroutines on the loop shared with the game engine so no thread is created per request.
+# The application is called directly on the loop and must therefore never block.
+#
+# An application that needs to wait, e.g., for output to long-poll, may instead yield an awaitable from its response
+# iterable which the server awaits in place of writing it. Such applications find "origin.suspend" in the environ.
+# Whatever the application yielded before an awaitable is sent ahead of waiting, using chunked transfer encoding,
+# so a response may also be streamed.
+#
+# Requests to upgrade to a WebSocket are offered to the application as described in App._websocket.
+#
+class AsyncioWsgiServer(object):
+
+    request_queue_size = 200        # Listen backlog
+    max_header_size = 64 * 1024     # Reject requests whose headers exceed this many bytes
+    keep_alive_timeout = 30         # Seconds an idle keep-alive connection is held open
+    max_body_size = int(1e6)        # Reject requests whose body exceeds this many bytes
+
+
+    def __init__(self, host, port, app, ssl_context=None):
+
+        self.host = host
+        self.port = port
+        self.app = app
+        self.ssl_context = ssl_context
+        self.server = None
+
+
+    #
+    # Begin accepting connections on the running event loop
+    #
+    async def start(self):
+
+        self.server = await asyncio.start_server(self.__handle_connection, self.host, self.port,
+                                                 ssl=self.ssl_context, backlog=self.request_queue_size,
+                                                 limit=self.max_header_size)
+
+
+    def close(self):
+
+        if self.server:
+            self.server.close()
+            self.server = None
+
+
+    #
+    # Serve requests arriving on a single client connection until it closes or asks not to be kept alive
+    #
+    async def __handle_connection(self, reader, writer):
+
+        try:
+
+            while True:
+
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keep_alive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+
+                request_line, _, header_block = head.partition(b"\r\n")
+                method, target, version = request_line.decode("latin-1").split(" ", 2)
+                headers = http.client.parse_headers(io.BytesIO(header_block))
+
+                # Turn away bodies that can't be read or are too large before buffering them on the shared loop
+                content_length = headers.get("Content-Length", "0").strip()
+
+                if not content_length.isdigit():
+                    self.__refuse(writer, version, "400 Bad Request")
+                    break
+
+                if int(content_length) > self.max_body_size:
+                    self.__refuse(writer, version, "413 Payload Too Large")
+                    break
+
+                body = b""
+                if int(content_length):
+                    body = await reader.readexactly(int(content_length))
+
+                environ = self.__build_environ(writer, method, target, version, headers, body)
+
+                if WebSocket.is_upgrade(environ):
+                    environ["origin.websocket"] = True
+                    await self.__upgrade(reader, writer, version, environ)
+                    break
+
+                keep_alive = version == "HTTP/1.1" and headers.get("Connection", "").lower() != "close"
+                keep_alive = await self.__respond(writer, version, environ, keep_alive)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+
+        except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+            pass
+
+        finally:
+            writer.close()
+
+
+    #
+    # Build a WSGI environment dictionary for the request. See PEP 3333.
+    #
+    def __build_environ(self, writer, method, target, version, headers, body):
+
+        path, _, query = target.partition("?")
+        peer = writer.get_extra_info("peername") or ("", 0)
+
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(path, "latin-1"),
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": version,
+            "REMOTE_ADDR": peer[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "https" if self.ssl_context else "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "origin.suspend": True
+        }
+
+        for name, value in headers.items():
+
+            key = "HTTP_" + name.upper().replace("-", "_")
+
+            if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                environ[key] = environ[key] + "," + value if key in environ else value
+
+        return environ
+
+
+    #
+    # Invoke the WSGI application and write its response, awaiting anything awaitable it yields. Unhandled errors are
+    # reported as a 500 unless part of the response has already been sent. Returns whether the connection may be
+    # kept alive.
+    #
+    async def __respond(self, writer, version, environ, keep_alive):
+
+        response = []
+        chunks = []
+        streaming = False
+
+        def start_response(status, response_headers, exc_info=None):
+            response[:] = [status, response_headers]
+
+        # HTTP/1.0 clients don't understand chunked encoding so their streamed responses end by closing the connection
+        chunked = version == "HTTP/1.1"
+
+        try:
+
+            result = self.app(environ, start_response)
+
+            try:
+
+                for chunk in result:
+
+                    if inspect.isawaitable(chunk):
+
+                        # Send what there is so far before waiting
+                        if chunks:
+
+                            if not streaming:
+                                streaming = True
+                                keep_alive = keep_alive and chunked
+                                self.__write_head(writer, version, *response, None, keep_alive, chunked)
+
+                            self.__write_chunks(writer, chunks, chunked)
+                            chunks = []
+                            await writer.drain()
+
+                        await chunk
+
+                    elif chunk:
+                        chunks.append(chunk)
+
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        except ConnectionError:
+            raise
+
+        except Exception:
+
+            traceback.print_exc()
+
+            if streaming:
+                return False
+
+            response = ["500 Internal server error", [("Content-Type", "text/plain")]]
+            chunks = [b"Error 500: Internal server error"]
+
+        if streaming:
+
+            self.__write_chunks(writer, chunks, chunked)
+
+            if chunked:
+                writer.write(b"0\r\n\r\n")
+
+            return keep_alive
+
+        self.__write_head(writer, version, *response, sum(len(chunk) for chunk in chunks), keep_alive, False)
+        writer.writelines(chunks)
+
+        return keep_alive
+
+
+    #
+    # Offer the application a WebSocket. Once it accepts, what arrives is read by a task of its own while the
+    # application's response body is sent as messages.
+    #
+    async def __upgrade(self, reader, writer, version, environ):
+
+        response = []
+
+        def start_response(status, response_headers, exc_info=None):
+            response[:] = [status, response_headers]
+
+        try:
+            result = self.app(environ, start_response)
+        except Exception:
+            traceback.print_exc()
+            result = [b"Error 500: Internal server error"]
+            response = ["500 Internal server error", [("Content-Type", "text/plain")]]
+
+        try:
+
+            # The application turned the upgrade down so send its response as it is
+            if not response[0].startswith("101"):
+                chunks = [chunk for chunk in result if chunk]
+                self.__write_head(writer, version, *response, sum(len(chunk) for chunk in chunks), False, False)
+                writer.writelines(chunks)
+                return
+
+            lines = ["HTTP/1.1 %s" % response[0]]
+            lines.extend("%s: %s" % header for header in response[1])
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+            websocket = WebSocket()
+            receive = environ["origin.websocket.receive"]
+            reading = asyncio.ensure_future(self.__read_websocket(reader, writer, websocket, receive))
+
+            try:
+
+                for chunk in result:
+
+                    if inspect.isawaitable(chunk):
+                        await chunk
+                    elif chunk:
+                        writer.write(WebSocket.frame(WebSocket.TEXT, chunk))
+                        await writer.drain()
+
+                if not websocket.closed:
+                    writer.write(WebSocket.close_frame())
+                    await writer.drain()
+
+            finally:
+                reading.cancel()
+
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+
+    @staticmethod
+    async def __read_websocket(reader, writer, websocket, receive):
+
+        try:
+
+            while not websocket.closed:
+
+                data = await reader.read(4096)
+
+                if not data:
+                    break
+
+                messages, replies = websocket.feed(data)
+
+                writer.writelines(replies)
+
+                for message in messages:
+                    receive(message)
+
+        # The client broke the protocol
+        except ValueError:
+            writer.write(WebSocket.close_frame(1002))
+
+        except ConnectionError:
+            pass
+
+        finally:
+            receive(None)
+
+
+    #
+    # Write the status line and headers. A response of unknown length is either chunked or ends when the connection
+    # closes.
+    #
+    def __write_head(self, writer, version, status, response_headers, content_length, keep_alive, chunked):
+
+        lines = ["%s %s" % (version, status)]
+        lines.extend("%s: %s" % (name, value) for name, value in response_headers
+                     if name.lower() not in ("content-length", "connection", "transfer-encoding"))
+
+        if content_length is not None:
+            lines.append("Content-Length: %d" % content_length)
+        elif chunked:
+            lines.append("Transfer-Encoding: chunked")
+
+        lines.append("Connection: %s" % ("keep-alive" if keep_alive else "close"))
+
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+
+    #
+    # Answer a request the server won't read and close the connection
+    #
+    def __refuse(self, writer, version, status):
+
+        body = ("Error %s" % status).encode("latin-1")
+
+        self.__write_head(writer, version, status, [("Content-Type", "text/plain")], len(body), False, False)
+        writer.write(body)
+
+
+    @staticmethod
+    def __write_chunks(writer, chunks, chunked):
+
+        for chunk in chunks:
+            if chunked:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            else:
+                writer.write(chunk)
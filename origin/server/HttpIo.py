@@ -1,6 +1,9 @@
 # coding=utf-8
 
+import asyncio
+import collections
 import sys
+import threading
 
 from origin.engine.Engine import Engine
 
@@ -9,9 +12,17 @@ from origin.engine.Engine import Engine
 # WSGI XHR IO implementation
 # Functions as a compliant WSGI application with built-in HTTP(S) server
 #
+# Requests polling for output may wait until there is some. Adding output wakes them, whether they wait on a
+# thread of the threaded server or as a coroutine on the asyncio server's event loop.
+#
+# Output streamed as server-sent events is numbered and the last replay_limit events are kept so a client that
+# reconnects can pick up where it left off.
+#
 class HttpIo(object):
 
 
+    replay_limit = 100
+
     def __init__(self, player_connection):
 
         self.player_connection = player_connection
@@ -19,13 +30,108 @@ class HttpIo(object):
         self.out_of_band = []         # special out of band actions (such as 'clear')
         self.last_output_line = None
         self.dont_echo_next = False   # used to hide password or generally prevent echoing of input back to the client
+        self.closed = False
+        self.ready = threading.Condition()
+        self.waiters = []             # futures of requests waiting on the event loop
+        self.event_id = 0             # id of the last output event streamed
+        self.events = collections.deque(maxlen=HttpIo.replay_limit)     # (id, payload) of recent output events
 
 
     #
     # Called on server shutdown
     #
     def destroy(self):
-        pass
+        self.closed = True
+        self.notify()
+
+
+    #
+    # Whether a request polling for output should return
+    #
+    @property
+    def has_output(self):
+        return bool(self.html_to_browser or self.out_of_band) or self.closed
+
+
+    #
+    # Wake any requests waiting for output
+    #
+    def notify(self):
+
+        with self.ready:
+
+            self.ready.notify_all()
+
+            waiters, self.waiters = self.waiters, []
+
+        for future in waiters:
+            future.get_loop().call_soon_threadsafe(HttpIo.__resolve, future)
+
+
+    #
+    # Block the calling thread until there is output, notify is called, or timeout seconds pass
+    #
+    def wait(self, timeout):
+
+        with self.ready:
+            if not self.has_output:
+                self.ready.wait(timeout)
+
+
+    #
+    # As with wait but for a coroutine on an event loop
+    #
+    async def wait_async(self, timeout):
+
+        future = asyncio.get_running_loop().create_future()
+
+        with self.ready:
+
+            if self.has_output:
+                return
+
+            self.waiters.append(future)
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        finally:
+            with self.ready:
+                if future in self.waiters:
+                    self.waiters.remove(future)
+
+
+    #
+    # Take any pending output as a new event, its payload made by calling format with the html and out of band
+    # lists, and return (id, payload) of every event after last_id. Streams of the same session share the events.
+    #
+    def take_events(self, last_id, format):
+
+        with self.ready:
+
+            # Ids from before the connection was made, e.g., by an earlier server, mean nothing now
+            if last_id > self.event_id:
+                last_id = 0
+
+            if self.html_to_browser or self.out_of_band:
+
+                html, self.html_to_browser = self.html_to_browser, []
+                oob, self.out_of_band = self.out_of_band, []
+
+                self.event_id += 1
+                self.events.append((self.event_id, format(html, oob)))
+
+            return [event for event in self.events if event[0] > last_id]
+
+
+    @staticmethod
+    def __resolve(future):
+
+        if not future.done():
+            future.set_result(None)
+
 
     #
     # Clear the player's screen
@@ -33,23 +139,28 @@ class HttpIo(object):
     def clear_screen(self):
         self.out_of_band.append("clear")
         self.dont_echo_next = True
+        self.notify()
 
 
     #
     # Format internal text if necessary
     #
     def render_output(self, paragraphs, **params):
+
         for text in paragraphs:
             self.html_to_browser.append(text)
 
+        if paragraphs:
+            self.notify()
+
 
     #
     # Write specified text to the client
     #
     def output(self, *lines):
         self.last_output_line = lines[-1]
-        for line in lines:
-            self.output_no_newline(line)
+        self.html_to_browser.extend(lines)
+        self.notify()
 
 
     #
@@ -58,6 +169,7 @@ class HttpIo(object):
     def output_no_newline(self, text):
         self.last_output_line = text
         self.html_to_browser.append(text)
+        self.notify()
 
 
     #
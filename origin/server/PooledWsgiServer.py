@@ -0,0 +1,217 @@
+# coding=utf-8
+
+import queue
+import threading
+import time
+
+from wsgiref.simple_server import WSGIServer
+
+from origin.engine.Histogram import Histogram
+
+
+#
+# A multi-threaded WSGI server with a fixed pool of worker threads. Accepted connections wait in a bounded queue for
+# a free worker so the number of threads, and with them memory, stays bounded however many clients arrive at once.
+# Once the queue is full further connections are turned away with 503 Service Unavailable and a Retry-After header.
+#
+# Requests that are held open, i.e., long-polls waiting for output, server-sent event streams and WebSockets, would
+# soon leave no workers for anything else. Before holding one open the application calls detach(), which it finds in
+# the environ as "origin.detach". The worker's thread then leaves the pool to see the request through and a new
+# worker takes its place. At most max_streams threads serve detached requests, a WebSocket counting for two as it
+# has a thread of its own reading the socket. Once there are that many detach() returns False and the application
+# answers without holding the request open.
+#
+class PooledWsgiServer(WSGIServer):
+
+    request_queue_size = 200    # Listen backlog
+
+
+    def __init__(self, server_address, RequestHandlerClass, workers, queue_limit, max_streams, retry_after):
+
+        super().__init__(server_address, RequestHandlerClass)
+
+        self.requests = queue.Queue(queue_limit)
+        self.queue_limit = queue_limit
+        self.max_streams = max_streams
+        self.retry_after = retry_after
+
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.busy = 0
+        self.streams = 0            # threads serving detached requests
+        self.served = 0
+        self.rejected = 0
+        self.streams_refused = 0
+        self.queue_wait = Histogram()
+        self.workers = set()
+        self.serial = 0
+
+        with self.lock:
+            for _ in range(workers):
+                self.__add_worker()
+
+
+    #
+    # Called on the thread accepting connections. Queue the connection for a worker rather than starting a thread.
+    #
+    def process_request(self, request, client_address):
+
+        try:
+            self.requests.put_nowait((request, client_address, time.monotonic()))
+        except queue.Full:
+            self.__reject(request)
+
+
+    #
+    # Called on a worker by a request that is about to be held open. threads is how many threads the request keeps
+    # busy. Returns whether it may be held open, in which case the worker is replaced and its thread ends once the
+    # request has finished.
+    #
+    def detach(self, threads=1):
+
+        with self.lock:
+
+            if self.local.detached:
+                return True
+
+            if self.streams + threads > self.max_streams:
+                self.streams_refused += 1
+                return False
+
+            self.local.detached = threads
+            self.streams += threads
+            self.busy -= 1
+            self.workers.discard(threading.current_thread())
+            self.__add_worker()
+
+        return True
+
+
+    #
+    # Stop the workers once the requests they're serving finish. Connections still queued are closed unanswered.
+    #
+    def server_close(self):
+
+        super().server_close()
+
+        while True:
+            try:
+                request, _, _ = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            self.shutdown_request(request)
+
+        with self.lock:
+            workers = list(self.workers)
+
+        # Workers busy with a request take theirs once it's done
+        for _ in workers:
+            try:
+                self.requests.put_nowait(None)
+            except queue.Full:
+                break
+
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join(1.0)
+
+
+    #
+    # Counters and queue wait times for the metrics endpoint
+    #
+    def stats(self):
+
+        with self.lock:
+
+            return {
+                "workers": len(self.workers),
+                "busy": self.busy,
+                "queued": self.requests.qsize(),
+                "queue_limit": self.queue_limit,
+                "served": self.served,
+                "rejected": self.rejected,
+                "streams": self.streams,
+                "max_streams": self.max_streams,
+                "streams_refused": self.streams_refused,
+                "queue_wait": self.queue_wait.summary()
+            }
+
+
+    #
+    # Start a worker thread. Called holding the lock.
+    #
+    def __add_worker(self):
+
+        self.serial += 1
+
+        worker = threading.Thread(name="wsgi-worker-%d" % self.serial, target=self.__work, daemon=True)
+        self.workers.add(worker)
+        worker.start()
+
+
+    def __work(self):
+
+        self.local.detached = 0
+
+        while not self.local.detached:
+
+            item = self.requests.get()
+
+            if item is None:
+                return
+
+            request, client_address, queued = item
+
+            with self.lock:
+                self.queue_wait.record(time.monotonic() - queued)
+                self.busy += 1
+
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+            with self.lock:
+
+                self.served += 1
+
+                # A replacement has already taken this worker's place in the pool
+                if self.local.detached:
+                    self.streams -= self.local.detached
+                else:
+                    self.busy -= 1
+
+
+    #
+    # Answer 503 on the accepting thread, which mustn't wait on the client. What has already arrived of the request is
+    # read, without waiting for more, since closing a socket with unread data resets the connection and the client
+    # may lose the response.
+    #
+    def __reject(self, request):
+
+        with self.lock:
+            self.rejected += 1
+
+        body = b"Error 503: Server busy"
+
+        response = ("HTTP/1.0 503 Service Unavailable\r\n"
+                    "Retry-After: %d\r\n"
+                    "Content-Type: text/plain\r\n"
+                    "Content-Length: %d\r\n"
+                    "Connection: close\r\n\r\n" % (self.retry_after, len(body))).encode("latin-1") + body
+
+        try:
+            request.setblocking(False)
+            request.recv(65536)
+        except OSError:
+            pass
+
+        # The response is far smaller than the socket's send buffer so sending never waits either
+        try:
+            request.send(response)
+        except OSError:
+            pass
+
+        self.shutdown_request(request)
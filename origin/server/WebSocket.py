@@ -0,0 +1,190 @@
+# coding=utf-8
+
+import base64
+import hashlib
+import struct
+
+
+#
+# The WebSocket protocol (RFC 6455) as used by both HTTP servers, independent of how they do I/O.
+#
+# Feed each WebSocket the bytes read from its client. It returns the messages that completed along with any frames
+# that need sending in reply, such as pongs and the reply to a close. Frames to send are made with frame().
+#
+class WebSocket(object):
+
+
+    guid = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+    CONTINUATION = 0x0
+    TEXT = 0x1
+    BINARY = 0x2
+    CLOSE = 0x8
+    PING = 0x9
+    PONG = 0xA
+
+    max_message = 1 << 16               # largest message accepted from a client
+
+
+    def __init__(self):
+
+        self.buffer = bytearray()
+        self.fragments = []
+        self.fragment_opcode = None
+        self.closed = False             # a close frame has been received
+
+
+    #
+    # Whether a request asks to be upgraded to a WebSocket
+    #
+    @staticmethod
+    def is_upgrade(environ):
+
+        return environ.get("HTTP_UPGRADE", "").lower() == "websocket" and \
+            "upgrade" in environ.get("HTTP_CONNECTION", "").lower()
+
+
+    #
+    # Headers of the 101 response accepting a WebSocket upgrade
+    #
+    @staticmethod
+    def handshake_headers(environ):
+
+        digest = hashlib.sha1((environ.get("HTTP_SEC_WEBSOCKET_KEY", "") + WebSocket.guid).encode("ascii")).digest()
+
+        return [("Upgrade", "websocket"),
+                ("Connection", "Upgrade"),
+                ("Sec-WebSocket-Accept", base64.b64encode(digest).decode("ascii"))]
+
+
+    #
+    # An unfragmented frame. Frames sent by the server are never masked.
+    #
+    @staticmethod
+    def frame(opcode, payload=b""):
+
+        length = len(payload)
+
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+
+        return header + payload
+
+
+    @staticmethod
+    def close_frame(code=1000):
+        return WebSocket.frame(WebSocket.CLOSE, struct.pack("!H", code))
+
+
+    #
+    # Take bytes read from the client and return a list of the messages completed, text as str and binary as bytes,
+    # and a list of frames to send in reply. Raises ValueError if the client breaks the protocol.
+    #
+    def feed(self, data):
+
+        self.buffer.extend(data)
+
+        messages = []
+        replies = []
+
+        while not self.closed:
+
+            frame = self.__next_frame()
+
+            if frame is None:
+                break
+
+            fin, opcode, payload = frame
+
+            if opcode == WebSocket.PING:
+                replies.append(WebSocket.frame(WebSocket.PONG, payload))
+
+            elif opcode == WebSocket.PONG:
+                pass
+
+            elif opcode == WebSocket.CLOSE:
+                self.closed = True
+                replies.append(WebSocket.frame(WebSocket.CLOSE, payload[:2]))
+
+            elif opcode in (WebSocket.TEXT, WebSocket.BINARY, WebSocket.CONTINUATION):
+
+                if opcode == WebSocket.CONTINUATION:
+                    if self.fragment_opcode is None:
+                        raise ValueError("Continuation frame without a message to continue")
+                elif self.fragment_opcode is not None:
+                    raise ValueError("New message before the last one finished")
+                else:
+                    self.fragment_opcode = opcode
+
+                self.fragments.append(payload)
+
+                if sum(len(fragment) for fragment in self.fragments) > WebSocket.max_message:
+                    raise ValueError("Message too large")
+
+                if fin:
+
+                    message = b"".join(self.fragments)
+
+                    if self.fragment_opcode == WebSocket.TEXT:
+                        message = message.decode("utf-8")
+
+                    messages.append(message)
+                    self.fragments = []
+                    self.fragment_opcode = None
+
+            else:
+                raise ValueError("Unknown opcode %d" % opcode)
+
+        return messages, replies
+
+
+    #
+    # Remove the next whole frame from the buffer and return (fin, opcode, unmasked payload), or None if it hasn't
+    # all arrived yet
+    #
+    def __next_frame(self):
+
+        buffer = self.buffer
+
+        if len(buffer) < 2:
+            return None
+
+        fin = bool(buffer[0] & 0x80)
+        opcode = buffer[0] & 0x0F
+        masked = buffer[1] & 0x80
+        length = buffer[1] & 0x7F
+        offset = 2
+
+        if not masked:
+            raise ValueError("Client frames must be masked")
+
+        if length == 126:
+            if len(buffer) < 4:
+                return None
+            length, = struct.unpack_from("!H", buffer, 2)
+            offset = 4
+
+        elif length == 127:
+            if len(buffer) < 10:
+                return None
+            length, = struct.unpack_from("!Q", buffer, 2)
+            offset = 10
+
+        if length > WebSocket.max_message:
+            raise ValueError("Frame too large")
+
+        end = offset + 4 + length
+
+        if len(buffer) < end:
+            return None
+
+        mask = bytes(buffer[offset:offset + 4]) * (length // 4 + 1)
+        payload = int.from_bytes(buffer[offset + 4:end], "big") ^ int.from_bytes(mask[:length], "big")
+
+        del buffer[:end]
+
+        return fin, opcode, payload.to_bytes(length, "big")
@@ -0,0 +1,157 @@
+# coding=utf-8
+
+import functools
+import threading
+import traceback
+
+from wsgiref.simple_server import ServerHandler
+
+from origin.server.NoLoggingRequestHandler import NoLoggingRequestHandler
+from origin.server.WebSocket import WebSocket
+
+
+#
+# Request handler for the threaded server that can upgrade a request to a WebSocket, which wsgiref doesn't support.
+# Upgrade requests are offered to the application as described in App._websocket. Once it accepts, the socket is
+# read on a thread of its own while the request's thread sends the application's response body as messages.
+# Other requests are handled exactly as WSGIRequestHandler would.
+#
+# Every request finds the server's detach in the environ as "origin.detach". Holding a WebSocket open ties up two
+# threads so it counts twice.
+#
+class WebSocketRequestHandler(NoLoggingRequestHandler):
+
+
+    def handle(self):
+
+        self.raw_requestline = self.rfile.readline(65537)
+
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+
+        # An error code has been sent, just exit
+        if not self.parse_request():
+            return
+
+        environ = self.get_environ()
+
+        if WebSocket.is_upgrade(environ):
+            environ["origin.detach"] = functools.partial(self.server.detach, 2)
+            environ["origin.websocket"] = True
+            self.__upgrade(environ)
+            return
+
+        environ["origin.detach"] = self.server.detach
+
+        handler = ServerHandler(self.rfile, self.wfile, self.get_stderr(), environ, multithread=False)
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+
+    def __upgrade(self, environ):
+
+        response = []
+
+        def start_response(status, response_headers, exc_info=None):
+            response[:] = [status, response_headers]
+
+        try:
+            result = self.server.get_app()(environ, start_response)
+        except Exception:
+            traceback.print_exc()
+            self.send_error(500)
+            return
+
+        try:
+
+            # The application turned the upgrade down so send its response as it is
+            if not response[0].startswith("101"):
+
+                body = b"".join(chunk for chunk in result)
+                self.__write_head(response[0], response[1] + [("Content-Length", str(len(body))),
+                                                              ("Connection", "close")])
+                self.wfile.write(body)
+
+                return
+
+            self.__write_head(*response)
+            self.__play(environ, result)
+
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+
+    def __write_head(self, status, response_headers):
+
+        lines = ["HTTP/1.1 %s" % status]
+        lines.extend("%s: %s" % header for header in response_headers)
+
+        self.wfile.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+
+    #
+    # Send the response body as messages while the reader thread hands the application what arrives
+    #
+    def __play(self, environ, result):
+
+        websocket = WebSocket()
+        receive = environ["origin.websocket.receive"]
+        write_lock = threading.Lock()
+
+        def send(data):
+            with write_lock:
+                self.wfile.write(data)
+
+        def read():
+
+            try:
+
+                while not websocket.closed:
+
+                    data = self.rfile.read1(4096)
+
+                    if not data:
+                        break
+
+                    messages, replies = websocket.feed(data)
+
+                    for reply in replies:
+                        send(reply)
+
+                    for message in messages:
+                        receive(message)
+
+            # The client broke the protocol
+            except ValueError:
+                try:
+                    send(WebSocket.close_frame(1002))
+                except OSError:
+                    pass
+
+            except OSError:
+                pass
+
+            finally:
+                receive(None)
+
+        reader = threading.Thread(name="websocket-reader", target=read, daemon=True)
+        reader.start()
+
+        try:
+
+            for chunk in result:
+                if chunk:
+                    send(WebSocket.frame(WebSocket.TEXT, chunk))
+
+            if not websocket.closed:
+                send(WebSocket.close_frame())
+
+        except OSError:
+            pass
+
+        reader.join(1.0)